@@ -1,51 +1,86 @@
 from __future__ import annotations
 
+import csv
+import io
 import json
+import math
+import multiprocessing
 import os
-import re
+import socket
+import threading
+import time
 import uuid
-from datetime import timedelta
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 # Load environment variables from .env file
 from dotenv import load_dotenv
 load_dotenv(Path(__file__).parent / ".env")
 
-from flask import Flask, jsonify, request, send_from_directory, session
-from werkzeug.security import check_password_hash, generate_password_hash
+from flask import Flask, Response, jsonify, request, send_from_directory, session, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
-import pytesseract
-from PIL import Image
-from pdf2image import convert_from_path
-import google.generativeai as genai
-import cv2
-import numpy as np
-
-from db import connect, default_db_path, init_db, query_one, query_all, exec_one
-
-# Configure Tesseract path with env override and PATH fallback
-_default_tesseract = Path(r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe")
-_env_tesseract = os.environ.get("TESSERACT_CMD")
-
-if _env_tesseract and Path(_env_tesseract).exists():
-    pytesseract.pytesseract.tesseract_cmd = _env_tesseract
-elif _default_tesseract.exists():
-    pytesseract.pytesseract.tesseract_cmd = str(_default_tesseract)
-else:
-    # Leave pytesseract to search PATH; helpful message on failure
-    print("[ledgerly] Tesseract executable not found at default location; relying on PATH.")
-
-# Gemini Vision API key (optional) and model override
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
-GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-
-# Allowed file extensions for bill uploads
-ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp", "bmp", "tiff", "pdf"}
-
-def allowed_file(filename: str) -> bool:
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+
+from db import ConnectionPool, DbConfig, default_db_path, init_db, normalize_identifier, query_one, query_all, exec_one
+from extraction import detect_amount, detect_voice_amount, regex_extract_bill, regex_extract_voice
+from gst import gst_summary, invalidate_gst_period, normalize_bill_date, parse_period
+from jobs import BillJobQueue
+from llm_backends import ExtractionBackend, backend_from_env
+from llm_cache import LlmCache
+from metrics import metrics, stage
+from passwords import DEFAULT_METHOD, HasherBusyError, PasswordHasher
+from rollups import add_to_rollups, rollup_series, rollup_totals
+from static_assets import IMMUTABLE_CACHE, StaticAssets
+from thumbnails import SIZES as BILL_IMAGE_SIZES, ensure_variant
+from uploads import SpoolingRequest, UploadRejected, store_upload
+
+if TYPE_CHECKING:
+    import numpy as np
+    from PIL import Image
+
+# The OCR stack (ocr.py: OpenCV, NumPy, Tesseract, Pillow, pdf2image) and the
+# Gemini SDK are imported when the first bill needs them, not at startup; set
+# LEDGERLY_WARMUP=1 (or call warm_up()) to load them in the background instead.
+WARMUP = os.environ.get("LEDGERLY_WARMUP", "0") == "1"
+
+# Bill pipeline: "two_pass" (extract, then always verify), "single_pass" (one
+# call that extracts and self-verifies) or "conditional" (verify only when the
+# extraction looks unreliable).
+GEMINI_PIPELINE_MODES = ("two_pass", "single_pass", "conditional")
+GEMINI_PIPELINE_MODE = os.environ.get("GEMINI_PIPELINE_MODE", "two_pass").strip().lower()
+if GEMINI_PIPELINE_MODE not in GEMINI_PIPELINE_MODES:
+    print(f"[ledgerly] Unknown GEMINI_PIPELINE_MODE={GEMINI_PIPELINE_MODE!r}; using two_pass.")
+    GEMINI_PIPELINE_MODE = "two_pass"
+GEMINI_VERIFY_THRESHOLD = float(os.environ.get("GEMINI_VERIFY_THRESHOLD", "0.5"))
+# LLM used for bill/voice structuring: gemini, regex (offline) or stub (local HTTP
+# stand-in), with LEDGERLY_LLM_TIMEOUT / _RETRIES / _CONCURRENCY limits.
+LLM_BACKEND: ExtractionBackend = backend_from_env()
+
+# Bill uploads: per-file cap (also applied to zip members) and whole-request cap
+UPLOAD_MAX_BYTES = int(float(os.environ.get("LEDGERLY_UPLOAD_MAX_MB", "20")) * 1024 * 1024)
+MAX_REQUEST_BYTES = int(float(os.environ.get("LEDGERLY_MAX_REQUEST_MB", "100")) * 1024 * 1024)
+# Multipart framing around a single file; bigger single-bill bodies are refused unread.
+MULTIPART_SLACK_BYTES = 64 * 1024
+
+
+def warm_up() -> None:
+    """Import the OCR stack and create the LLM client ahead of the first bill.
+
+    Safe to call from a server hook (e.g. gunicorn ``post_worker_init``) or a
+    background thread; each step only happens once per process.
+    """
+    started = time.perf_counter()
+    import ocr  # noqa: F401
+
+    LLM_BACKEND.warm_up()
+    print(f"[ledgerly] OCR/LLM warm-up took {(time.perf_counter() - started) * 1000:.0f}ms")
+
 
 def _clean_json_text(raw_text: str) -> str:
     """Extract JSON from LLM response (handles ```json blocks)."""
@@ -61,69 +96,24 @@ def _clean_json_text(raw_text: str) -> str:
                 return part
     return text
 
-# ================================
-# 🔥 STEP 1: IMAGE PREPROCESSING
-# ================================
-def preprocess_bill_image(image_path: Path) -> Path:
-    """
-    Preprocess bill image for better OCR and LLM accuracy.
-    - Converts to grayscale
-    - Applies adaptive thresholding to remove shadows
-    - Enhances handwriting visibility
-    """
-    try:
-        img = cv2.imread(str(image_path), cv2.IMREAD_GRAYSCALE)
-        if img is None:
-            return image_path  # Return original if can't read
-        
-        # Adaptive threshold - removes shadows, enhances text
-        processed = cv2.adaptiveThreshold(
-            img, 255,
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY,
-            11, 2
-        )
-        
-        # Save processed image alongside original
-        processed_path = image_path.parent / f"processed_{image_path.name}"
-        cv2.imwrite(str(processed_path), processed)
-        return processed_path
-    except Exception:
-        return image_path  # Return original on any error
-
-
-def pdf_to_image(pdf_path: Path) -> Path:
-    """Convert first page of PDF to an image file and return its path."""
-    poppler_path = os.environ.get("POPPLER_PATH")  # Optional: path to poppler bin on Windows
-    try:
-        images = convert_from_path(str(pdf_path), first_page=1, last_page=1, poppler_path=poppler_path)
-        if not images:
-            return pdf_path
-        out_path = pdf_path.with_suffix(".png")
-        images[0].save(out_path, "PNG")
-        return out_path
-    except Exception as e:
-        print(f"[ledgerly] PDF conversion failed: {e}")
-        return pdf_path
-
 # ================================
 # 🎯 STEP 3: EXTRACTION_PROMPT
 # ================================
 EXTRACTION_PROMPT = """
 Analyze this Indian GST bill and extract the following information in JSON format:
-{
+{{
   "vendor_name": "",
   "vendor_gstin": "",
   "bill_number": "",
   "bill_date": "",
   "items": [
-    {
+    {{
       "description": "",
       "hsn_code": "",
       "quantity": 0,
       "rate": 0,
       "amount": 0
-    }
+    }}
   ],
   "subtotal": 0,
   "cgst_rate": 0,
@@ -133,7 +123,7 @@ Analyze this Indian GST bill and extract the following information in JSON forma
   "igst_rate": 0,
   "igst_amount": 0,
   "total_amount": 0
-}
+}}
 
 Return ONLY valid JSON, no markdown formatting.
 
@@ -162,28 +152,51 @@ Your job:
 
 Return ONLY the corrected JSON (same schema, no explanations)."""
 
+# ================================
+# ⚡ SINGLE-PASS PROMPT (extract + self-verify)
+# ================================
+COMBINED_PROMPT = EXTRACTION_PROMPT.replace(
+    "Return ONLY valid JSON, no markdown formatting.",
+    """Before answering, audit your own extraction against the image:
+- Check that total_amount = subtotal + cgst_amount + sgst_amount + igst_amount
+- Ensure totals look visually plausible against the bill image
+- Fix obvious mistakes
+- If unsure, set fields to null or 0.
+
+Return ONLY the final corrected JSON, no markdown formatting.""",
+)
+
 # ================================
 # 🎙️ VOICE EXTRACTION PROMPT
 # ================================
 VOICE_EXTRACTION_PROMPT = """
 Analyze this voice transcript for an accounting entry and extract the following information in JSON format:
-{
+{{
   "entry_type": "income" | "expense",
   "amount": 0,
   "note": "Description of the transaction",
   "items": [
-    {
+    {{
       "name": "item name",
       "quantity": 1,
       "unit": "kg/pcs/etc",
       "price": 0
-    }
+    }}
   ]
-}
+}}
 
 Transcript: "{transcript}"
 """
 
+# Bump a version whenever its prompt text changes so cached LLM responses
+# for the old wording are no longer used.
+PROMPT_VERSIONS = {
+    "extraction": "1",
+    "verification": "1",
+    "combined": "1",
+    "voice": "1",
+}
+
 # ================================
 # 🧪 STEP 5: RULE-BASED VALIDATION
 # ================================
@@ -229,197 +242,252 @@ def validate_bill_data(bill: dict) -> dict:
     return bill
 
 
-def _fallback_extract_from_ocr(ocr_text: str) -> dict:
-    """Lightweight regex-based extraction used when no Gemini API key is set."""
-    # Amount detection (reuse patterns similar to upload handler)
-    amount_patterns = [
-        r"(?:₹|Rs\.?|INR)\s*([\d,]+\.?\d*)",
-        r"Total[:\s]*([\d,]+\.?\d*)",
-        r"Amount[:\s]*([\d,]+\.?\d*)",
-        r"Grand\s*Total[:\s]*([\d,]+\.?\d*)",
-        r"\b([\d,]+\.\d{2})\b",
-    ]
-    detected_amount = None
-    for pattern in amount_patterns:
-        m = re.search(pattern, ocr_text, re.IGNORECASE)
-        if m:
-            try:
-                detected_amount = float(m.group(1).replace(",", ""))
-                break
-            except ValueError:
-                continue
+def _totals_reconcile(bill: dict, tolerance: float = 0.02) -> bool:
+    """True when total_amount matches subtotal + CGST + SGST + IGST (within ``tolerance``)."""
+    total = bill.get("total_amount")
+    subtotal = bill.get("subtotal")
+    if not isinstance(total, (int, float)) or not isinstance(subtotal, (int, float)) or total <= 0:
+        return False
+    taxes = sum(
+        v for v in (bill.get("cgst_amount"), bill.get("sgst_amount"), bill.get("igst_amount"))
+        if isinstance(v, (int, float))
+    )
+    return abs(subtotal + taxes - total) <= total * tolerance
+
+
+def _needs_verification(bill: dict) -> bool:
+    """Decide whether a first-pass extraction should get the verification call."""
+    if GEMINI_PIPELINE_MODE == "two_pass":
+        return True
+    if GEMINI_PIPELINE_MODE != "conditional":
+        return False
+    # validate_bill_data mutates its argument; score a shallow copy.
+    scored = validate_bill_data(dict(bill))
+    return scored["confidence"] < GEMINI_VERIFY_THRESHOLD or not _totals_reconcile(bill)
 
-    # Date detection (simple dd/mm/yyyy or yyyy-mm-dd)
-    date_patterns = [
-        r"(\d{1,2}[\-/]\d{1,2}[\-/]\d{2,4})",
-        r"(\d{4}[\-/]\d{1,2}[\-/]\d{1,2})",
-    ]
-    bill_date = None
-    for pattern in date_patterns:
-        m = re.search(pattern, ocr_text)
-        if m:
-            bill_date = m.group(1)
-            break
-
-    # Vendor name: first non-empty line that isn't obviously a label
-    vendor_name = None
-    for line in ocr_text.splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        if any(label in line.lower() for label in ["invoice", "bill", "date", "gst", "total", "amount"]):
-            continue
-        vendor_name = line
-        break
-
-    return {
-        "vendor_name": vendor_name,
-        "vendor_gstin": None,
-        "bill_number": None,
-        "bill_date": bill_date,
-        "items": [],
-        "subtotal": None,
-        "cgst_rate": None,
-        "cgst_amount": None,
-        "sgst_rate": None,
-        "sgst_amount": None,
-        "igst_rate": None,
-        "igst_amount": None,
-        "total_amount": detected_amount,
-        "confidence": 0.35 if detected_amount else 0.2,
-    }
-
-def extract_voice_data_simple(transcript: str) -> dict:
-    """Fallback extraction using regex for voice data.
-    
-    Handles Hinglish patterns like:
-    - "5 kilo chawal 500 rupaye mein becha" -> amount=500, type=income
-    - "200 rupees ka rice kharida" -> amount=200, type=expense
-    - "received 1000 from customer" -> amount=1000, type=income
-    """
-    import re
-    text_lower = transcript.lower()
-    
-    amount = 0
-    
-    # Priority 1: Look for currency patterns (rupaye/rupees/rs/₹ followed/preceded by number)
-    # Pattern: number + rupaye/rupees/rs OR ₹ + number
-    currency_patterns = [
-        r"(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:rupaye|rupees|rupiya|rs\.?|₹)",  # 500 rupaye
-        r"(?:rupaye|rupees|rupiya|rs\.?|₹)\s*(\d+(?:,\d+)*(?:\.\d+)?)",  # rs 500
-        r"(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:ka|ke|ki|mein|me|में)",  # 500 ka (Hindi pattern)
-    ]
-    
-    for pattern in currency_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            amount_str = match.group(1).replace(",", "")
-            try:
-                amount = float(amount_str)
-                break
-            except ValueError:
-                continue
-    
-    # Priority 2: If no currency pattern found, look for the largest number (likely the amount)
-    if amount == 0:
-        all_numbers = re.findall(r"(\d+(?:,\d+)*(?:\.\d+)?)", transcript)
-        if all_numbers:
-            numbers = [float(n.replace(",", "")) for n in all_numbers]
-            # Take the largest number as the amount
-            amount = max(numbers)
-    
-    # Determine entry type based on keywords
-    entry_type = "expense"  # Default
-    income_keywords = ["sold", "received", "income", "becha", "bech", "diya", "milaa", "mila", "aaya", "aayi", "payment received"]
-    expense_keywords = ["bought", "purchased", "kharida", "liya", "spent", "paid", "expense"]
-    
-    for keyword in income_keywords:
-        if keyword in text_lower:
-            entry_type = "income"
-            break
-    
-    # Check expense keywords only if not already marked as income
-    if entry_type == "income":
-        for keyword in expense_keywords:
-            if keyword in text_lower:
-                # Income keywords take precedence, but check context
-                break
-    else:
-        for keyword in expense_keywords:
-            if keyword in text_lower:
-                entry_type = "expense"
-                break
-        
-    return {
-        "entry_type": entry_type,
-        "amount": amount,
-        "note": transcript,
-        "items": []
-    }
 
 # ================================
 # 🧠 MAIN EXTRACTION PIPELINE
 # ================================
-def run_gemini_structured(image_path: Path, ocr_text: str) -> dict | None:
+def _generate_json(
+    task: str,
+    prompt_version: str,
+    prompt: str,
+    image: Image.Image | None = None,
+    context: dict | None = None,
+    cache: LlmCache | None = None,
+):
+    """Ask the configured LLM backend for ``task`` and parse the JSON reply.
+
+    When a cache is given, identical (model, prompt version, inputs) skip the
+    backend call; only responses that parse as JSON are stored.
+    """
+    backend = LLM_BACKEND
+    namespace = backend.cache_namespace if cache is not None else None
+    key = None
+    if namespace is not None:
+        key_parts = [prompt]
+        if image is not None:
+            key_parts.append(f"{image.mode}:{image.size}".encode() + image.tobytes())
+        key = cache.make_key(namespace, prompt_version, *key_parts)
+        cached = cache.get(key)
+        if cached is not None:
+            return json.loads(_clean_json_text(cached))
+
+    raw = backend.generate(task, prompt, image, context)
+    parsed = json.loads(_clean_json_text(raw))
+    if key is not None:
+        cache.put(key, namespace, prompt_version, raw)
+    return parsed
+
+
+def run_gemini_structured(image: np.ndarray | None, ocr_text: str, cache: LlmCache | None = None) -> dict | None:
     """
     Complete bill extraction pipeline:
-    1. Preprocess image
-    2. Extract with Gemini Vision
-    3. Verify with second LLM pass
+    1. Take the preprocessed image array (shared with Tesseract), if the backend wants it
+    2. Extract with the configured LLM backend (Gemini Vision by default)
+    3. Verify with second LLM pass (always, never or conditionally per GEMINI_PIPELINE_MODE)
     4. Apply rule-based validation
     """
-    if not GEMINI_API_KEY:
-        return _fallback_extract_from_ocr(ocr_text)
-
     try:
-        # Preprocess image for better accuracy
-        processed_path = preprocess_bill_image(image_path)
-        
-        # Load image for Gemini (ensure RGB)
-        pil_image = Image.open(processed_path).convert("RGB")
-        
-        # STEP 3: First extraction pass
-        extraction_prompt = EXTRACTION_PROMPT.format(ocr_text=ocr_text)
-        model_name = GEMINI_MODEL or "gemini-1.5-flash"
-        model = genai.GenerativeModel(model_name)
-        
-        response = model.generate_content([extraction_prompt, pil_image])
-        raw = response.text or ""
-        extracted = json.loads(_clean_json_text(raw))
-        
+        # Wrap the in-memory array for the LLM (ensure RGB)
+        pil_image = None
+        if image is not None:
+            from PIL import Image
+
+            pil_image = Image.fromarray(image).convert("RGB")
+
+        # STEP 3: First extraction pass (self-verifying in single-pass mode)
+        if GEMINI_PIPELINE_MODE == "single_pass":
+            prompt, prompt_version = COMBINED_PROMPT.format(ocr_text=ocr_text), PROMPT_VERSIONS["combined"]
+        else:
+            prompt, prompt_version = EXTRACTION_PROMPT.format(ocr_text=ocr_text), PROMPT_VERSIONS["extraction"]
+
+        with stage("llm_extract"):
+            extracted = _generate_json(
+                "bill_extract", prompt_version, prompt, pil_image, {"ocr_text": ocr_text}, cache
+            )
+
         if not isinstance(extracted, dict):
             return None
-        
+
         # STEP 4: Verification pass (second LLM call)
-        try:
-            verify_prompt = VERIFICATION_PROMPT.format(
-                extracted_json=json.dumps(extracted, indent=2)
-            )
-            verify_response = model.generate_content([verify_prompt, pil_image])
-            verify_raw = verify_response.text or ""
-            verified = json.loads(_clean_json_text(verify_raw))
-            
-            if isinstance(verified, dict):
-                extracted = verified  # Use verified version
-        except Exception:
-            pass  # Keep original extraction if verification fails
-        
-        # STEP 5: Rule-based validation
-        validated = validate_bill_data(extracted)
-        
-        # Cleanup processed image
-        if processed_path != image_path and processed_path.exists():
+        if LLM_BACKEND.verifies and _needs_verification(extracted):
             try:
-                processed_path.unlink()
+                verify_prompt = VERIFICATION_PROMPT.format(
+                    extracted_json=json.dumps(extracted, indent=2)
+                )
+                with stage("llm_verify"):
+                    verified = _generate_json(
+                        "bill_verify", PROMPT_VERSIONS["verification"], verify_prompt, pil_image,
+                        {"extracted": extracted}, cache,
+                    )
+
+                if isinstance(verified, dict):
+                    extracted = verified  # Use verified version
             except Exception:
-                pass
-        
-        return validated
-        
+                pass  # Keep original extraction if verification fails
+
+        # STEP 5: Rule-based validation
+        with stage("validate"):
+            return validate_bill_data(extracted)
+
     except Exception as e:
-        print(f"Gemini extraction error: {e}")
+        print(f"[ledgerly] {LLM_BACKEND.name} extraction error: {e}")
         return None
 
+def extraction_version() -> str:
+    """What produces bill extractions right now: backend/model, pipeline mode and prompt versions.
+
+    Stored with each LLM extraction; re-uploads of the same file reuse it only
+    while this still matches.
+    """
+    prompts = ",".join(f"{task}={version}" for task, version in sorted(PROMPT_VERSIONS.items()) if task != "voice")
+    model = LLM_BACKEND.cache_namespace or LLM_BACKEND.name
+    return f"{LLM_BACKEND.name}:{model}/{GEMINI_PIPELINE_MODE}/{prompts}"
+
+
+def structure_bill(image: np.ndarray | None, ocr_text: str, cache: LlmCache | None = None) -> dict:
+    """Turn OCR output into the structured bill dict (Gemini when available, regex fallback otherwise).
+
+    Results from the LLM path carry ``extraction_version``; regex fallbacks don't.
+    """
+    # Structure with the configured LLM backend (Gemini Vision, regex or local stub)
+    structured = run_gemini_structured(image, ocr_text, cache) or {}
+
+    # If LLM/gemini returned nothing useful, fall back to OCR regex extraction
+    if not structured or (structured.get("total_amount") in (None, 0) and not structured.get("items")):
+        structured = regex_extract_bill(ocr_text)
+    else:
+        structured["extraction_version"] = extraction_version()
+
+    # Minimal item spotting heuristic: if no items but we have a total, create a single inferred line item
+    if structured.get("items") in (None, [], ()):  # empty items
+        total_val = structured.get("total_amount") or structured.get("detected_amount")
+        if total_val:
+            structured["items"] = [{
+                "description": "Inferred item",
+                "hsn_code": None,
+                "quantity": 1,
+                "rate": total_val,
+                "amount": total_val
+            }]
+
+    return structured
+
+
+def validate_entry(data: dict) -> tuple[dict | None, str | None]:
+    """Validate ledger entry input (the rules of POST /api/entries).
+
+    Returns ({"entry_type", "amount", "note"}, None) or (None, error code).
+    """
+    entry_type = (data.get("entry_type") or "").strip().lower()
+    note = (data.get("note") or "").strip() or None
+    amount = data.get("amount")
+
+    if entry_type not in {"income", "expense"}:
+        return None, "entry_type_invalid"
+
+    if amount is None:
+        return None, "amount_invalid"
+
+    try:
+        amount_val = float(amount)
+    except Exception:
+        return None, "amount_invalid"
+    if not math.isfinite(amount_val):
+        return None, "amount_invalid"
+
+    return {"entry_type": entry_type, "amount": amount_val, "note": note}, None
+
+
+def validate_import_row(data: dict) -> tuple[dict | None, str | None]:
+    """Validate one imported row: the base entry rules plus optional GST columns and created_at."""
+    fields, error = validate_entry(data)
+    if error is not None:
+        return None, error
+
+    for column in ("vendor_name", "vendor_gstin", "bill_number"):
+        value = data.get(column)
+        fields[column] = (str(value).strip() or None) if value is not None else None
+    if fields["vendor_gstin"]:
+        fields["vendor_gstin"] = fields["vendor_gstin"].upper()
+    fields["bill_date"] = normalize_bill_date(data.get("bill_date"))
+
+    for column in ("taxable_amount", "cgst_amount", "sgst_amount", "igst_amount"):
+        value = data.get(column)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            fields[column] = None
+            continue
+        try:
+            fields[column] = float(value)
+        except (TypeError, ValueError):
+            return None, f"{column}_invalid"
+        if not math.isfinite(fields[column]):
+            return None, f"{column}_invalid"
+
+    created_at = data.get("created_at") or data.get("date")
+    if created_at:
+        try:
+            parsed = datetime.fromisoformat(str(created_at).strip())
+        except ValueError:
+            return None, "created_at_invalid"
+        fields["created_at"] = parsed.strftime("%Y-%m-%d %H:%M:%S")
+    else:
+        fields["created_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+    return fields, None
+
+
+_ocr_process_pool: ProcessPoolExecutor | None = None
+_ocr_process_pool_lock = threading.Lock()
+
+
+def get_ocr_process_pool() -> ProcessPoolExecutor:
+    """Shared process pool for CPU-bound OCR/preprocessing (one worker per core by default).
+
+    Workers are spawned rather than forked: a fork of this multithreaded server
+    can inherit a lock another thread holds (metrics, DB pool, executors) and
+    hang forever.
+    """
+    global _ocr_process_pool
+    with _ocr_process_pool_lock:
+        if _ocr_process_pool is None:
+            _ocr_process_pool = ProcessPoolExecutor(
+                max_workers=OCR_PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _ocr_process_pool
+
+
+def discard_ocr_process_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a pool that lost a worker (BrokenProcessPool); the next batch starts a fresh one."""
+    global _ocr_process_pool
+    with _ocr_process_pool_lock:
+        if _ocr_process_pool is pool:
+            _ocr_process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
 FRONTEND_DIR = Path(__file__).resolve().parents[1]
 PAGES_DIR = FRONTEND_DIR / "pages"
 STYLES_DIR = FRONTEND_DIR / "styles"
@@ -427,10 +495,64 @@ SCRIPTS_DIR = FRONTEND_DIR / "script"
 UPLOADS_DIR = FRONTEND_DIR / "uploads"
 BILLS_UPLOAD_DIR = UPLOADS_DIR / "bills"
 
+# Ledger export: columns (in order) and rows fetched/written per chunk
+EXPORT_COLUMNS = (
+    "id", "created_at", "entry_type", "amount", "note", "vendor_name", "vendor_gstin", "bill_number",
+    "bill_date", "taxable_amount", "cgst_amount", "sgst_amount", "igst_amount",
+)
+EXPORT_CHUNK_SIZE = 500
+
+# Ledger import: columns written, rows per executemany batch, row errors reported
+IMPORT_COLUMNS = (
+    "entry_type", "amount", "note", "vendor_name", "vendor_gstin", "bill_number", "bill_date",
+    "taxable_amount", "cgst_amount", "sgst_amount", "igst_amount", "created_at",
+)
+IMPORT_BATCH_SIZE = 5000
+IMPORT_MAX_ERRORS = 100
+
+# Batch uploads: max files per request (zip members included), OCR processes
+# (defaults to the core count) and concurrent Gemini calls.
+BATCH_MAX_FILES = int(os.environ.get("LEDGERLY_BATCH_MAX_FILES", "50"))
+OCR_PROCESS_WORKERS = int(os.environ.get("LEDGERLY_OCR_PROCESSES", "0")) or (os.cpu_count() or 1)
+GEMINI_BATCH_CONCURRENCY = int(os.environ.get("GEMINI_BATCH_CONCURRENCY", "4"))
+
+# /api/entries page sizes
+ENTRIES_PAGE_SIZE = 50
+ENTRIES_MAX_PAGE_SIZE = 200
+
+# A process holds a lease on each bill it is processing and renews it every third of
+# BILL_LEASE_SECONDS; bills whose lease ran out (the process died) are requeued this
+# many times, then failed.
+BILL_LEASE_SECONDS = int(os.environ.get("LEDGERLY_BILL_LEASE_SECONDS", "60"))
+BILL_REQUEUE_LIMIT = int(os.environ.get("LEDGERLY_BILL_REQUEUE_LIMIT", "1"))
+
+# Upper bound for a single long-poll wait, and SSE stream lifetime/keep-alive interval (seconds)
+BILL_WAIT_TIMEOUT = float(os.environ.get("LEDGERLY_BILL_WAIT_TIMEOUT", "25"))
+BILL_EVENTS_TIMEOUT = float(os.environ.get("LEDGERLY_BILL_EVENTS_TIMEOUT", "120"))
+BILL_EVENTS_KEEPALIVE = 15.0
+
+# Password hashing: Werkzeug method/cost (changing it rehashes users on their next
+# login), parallel hashes and how many more may queue before logins get 429.
+PASSWORD_HASH_METHOD = os.environ.get("LEDGERLY_PASSWORD_HASH", DEFAULT_METHOD)
+PASSWORD_HASH_WORKERS = int(os.environ.get("LEDGERLY_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE = int(os.environ.get("LEDGERLY_HASH_QUEUE", "32"))
+
+# Requests and bill jobs slower than this are logged with a per-stage breakdown (0 disables).
+SLOW_REQUEST_SECONDS = float(os.environ.get("LEDGERLY_SLOW_REQUEST_MS", "2000")) / 1000
+
 
 def create_app() -> Flask:
     app = Flask(__name__)
 
+    class AppRequest(SpoolingRequest):
+        spool_dir = BILLS_UPLOAD_DIR
+        spool_prefixes = ("/api/bills/",)
+        max_file_bytes = UPLOAD_MAX_BYTES
+
+    # Bill files stream to disk as they are parsed; bodies over the cap get 413 unread.
+    app.request_class = AppRequest
+    app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BYTES or None
+
     # Use an env var in real deployments.
     app.secret_key = os.environ.get("LEDGERLY_SECRET_KEY", "dev-secret-change-me")
     app.permanent_session_lifetime = timedelta(days=14)
@@ -439,28 +561,97 @@ def create_app() -> Flask:
     init_db(db_path)
     BILLS_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+    # Long-lived connections; PRAGMA setup happens once per pooled connection.
+    # Checkout waits are recorded as the "db_acquire" stage.
+    db_pool = ConnectionPool(
+        DbConfig.from_env(db_path),
+        on_acquire=lambda seconds: metrics.record_stage("db_acquire", seconds),
+    )
+
+    def get_conn():
+        return db_pool.connection()
+
+    def begin_write(conn) -> None:
+        """Take the write lock; time spent waiting on other writers (busy_timeout) is "db_lock"."""
+        with stage("db_lock"):
+            conn.execute("BEGIN IMMEDIATE")
+
+    llm_cache = None
+    if os.environ.get("LEDGERLY_LLM_CACHE", "1") != "0":
+        llm_cache = LlmCache(
+            get_conn,
+            ttl_seconds=float(os.environ.get("LEDGERLY_LLM_CACHE_TTL", 30 * 24 * 3600)),
+            max_entries=int(os.environ.get("LEDGERLY_LLM_CACHE_MAX_ENTRIES", "5000")),
+        )
+
+    passwords = PasswordHasher(PASSWORD_HASH_METHOD, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE)
+
     def ensure_demo_user() -> None:
-        with connect(db_path) as conn:
+        with get_conn() as conn:
             existing = query_one(conn, "SELECT id FROM users WHERE email = ?", ("demo@ledgerly.in",))
             if existing is None:
-                pwd_hash = generate_password_hash("Ledgerly@123")
+                pwd_hash = passwords.hash("Ledgerly@123")
                 exec_one(
                     conn,
-                    "INSERT INTO users (username, email, password_hash) VALUES (?,?,?)",
-                    ("Demo Owner", "demo@ledgerly.in", pwd_hash),
+                    "INSERT INTO users (username, email, password_hash, username_norm, email_norm) VALUES (?,?,?,?,?)",
+                    ("Demo Owner", "demo@ledgerly.in", pwd_hash, "demo owner", "demo@ledgerly.in"),
                 )
 
     ensure_demo_user()
 
+    if WARMUP:
+        threading.Thread(target=warm_up, name="ledgerly-warmup", daemon=True).start()
+
+    metrics.describe("ledgerly_http_request_seconds", "Time to produce a response, by route.")
+    metrics.describe("ledgerly_bill_job_seconds", "Background bill processing time, by outcome.")
+
+    def log_if_slow(trace, label: str) -> None:
+        elapsed = trace.elapsed()
+        if SLOW_REQUEST_SECONDS and elapsed >= SLOW_REQUEST_SECONDS:
+            print(f"[ledgerly] slow {label}: {elapsed * 1000:.0f}ms ({trace.breakdown()})")
+
+    @app.errorhandler(RequestEntityTooLarge)
+    def upload_too_large(e):
+        limit = UPLOAD_MAX_BYTES if request.path.startswith("/api/bills/") else MAX_REQUEST_BYTES
+        return jsonify({
+            "error": "file_too_large",
+            "message": f"Uploads are limited to {limit // (1024 * 1024)} MB.",
+        }), 413
+
+    @app.errorhandler(HasherBusyError)
+    def password_hashing_busy(e):
+        response = jsonify({"error": "server_busy", "message": "Too many sign-ins right now, try again shortly."})
+        response.headers["Retry-After"] = "1"
+        return response, 429
+
+    @app.before_request
+    def start_request_trace():
+        metrics.start_trace(request.path)
+
     @app.after_request
-    def add_header(response):
-        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-        response.headers["Pragma"] = "no-cache"
-        response.headers["Expires"] = "0"
+    def record_request_timing(response):
+        trace = metrics.finish_trace()
+        if trace is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            metrics.observe(
+                "ledgerly_http_request_seconds", trace.elapsed(),
+                method=request.method, route=route, status=str(response.status_code),
+            )
+            log_if_slow(trace, f"{request.method} {request.path} -> {response.status_code}")
         return response
 
-    def get_conn():
-        return connect(db_path)
+    @app.teardown_request
+    def clear_request_trace(_exc):
+        metrics.finish_trace()
+
+    @app.after_request
+    def add_header(response):
+        # API responses are per-user and live; static files set their own caching.
+        if request.path.startswith("/api/"):
+            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+            response.headers["Pragma"] = "no-cache"
+            response.headers["Expires"] = "0"
+        return response
 
     def current_user_id() -> int | None:
         user_id = session.get("user_id")
@@ -475,17 +666,46 @@ def create_app() -> Flask:
     # -------------------------
     # Frontend file serving
     # -------------------------
+    # Hashed and compressed once; pages link to fingerprinted (immutable) asset URLs.
+    assets = StaticAssets({"styles": STYLES_DIR, "script": SCRIPTS_DIR, "uploads": UPLOADS_DIR}, PAGES_DIR)
+    assets.warm()
+
+    def serve_page(name: str):
+        page = assets.page_asset(name)
+        if page is None:
+            return send_from_directory(PAGES_DIR, name)
+        return assets.respond(page, request)
+
     @app.get("/")
     def serve_index():
-        return send_from_directory(PAGES_DIR, "index.html")
+        return serve_page("index.html")
 
     @app.get("/dashboard")
     def serve_dashboard():
-        return send_from_directory(PAGES_DIR, "dashboard.html")
+        return serve_page("dashboard.html")
 
     @app.get("/insights")
     def serve_insights():
-        return send_from_directory(PAGES_DIR, "insights.html")
+        return serve_page("insights.html")
+
+    # WEBP thumbnails/previews of bill images, rendered on first request.
+    bill_variants_dir = BILLS_UPLOAD_DIR / "variants"
+
+    def serve_bill_variant(name: str, size: str):
+        """``/uploads/bills/<file>?size=thumb|preview``: a cached WEBP rendition of a bill."""
+        if size not in BILL_IMAGE_SIZES:
+            return jsonify({"error": "size_invalid", "message": f"size must be one of {', '.join(BILL_IMAGE_SIZES)}"}), 400
+        source = safe_join(str(BILLS_UPLOAD_DIR), name)
+        if source is None or "/" in name or not os.path.isfile(source):
+            return jsonify({"error": "not_found"}), 404
+        with stage("bill_thumbnail"):
+            variant = ensure_variant(Path(source), size, bill_variants_dir)
+        if variant is None:
+            return jsonify({"error": "preview_unavailable"}), 404
+        # Bill files are named by content hash, so a variant URL never changes content.
+        response = send_from_directory(bill_variants_dir, variant.name, mimetype="image/webp")
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE
+        return response
 
     @app.get("/<path:path>")
     def serve_static(path: str):
@@ -493,21 +713,26 @@ def create_app() -> Flask:
         if path.startswith("api/"):
             return jsonify({"error": "not_found"}), 404
 
+        mount, _, inner = path.partition("/")
+        asset = assets.asset(mount, inner)
+        if asset is not None:
+            return assets.respond(asset, request)
+
         if path.startswith("styles/"):
-            inner = path.split("/", 1)[1]
             return send_from_directory(STYLES_DIR, inner)
 
         if path.startswith("script/"):
-            inner = path.split("/", 1)[1]
             return send_from_directory(SCRIPTS_DIR, inner)
 
+        if path.startswith("uploads/bills/") and "size" in request.args:
+            return serve_bill_variant(inner.partition("/")[2], request.args["size"])
+
         if path.startswith("uploads/"):
-            inner = path.split("/", 1)[1]
             return send_from_directory(UPLOADS_DIR, inner)
 
         page_candidate = PAGES_DIR / path
         if page_candidate.is_file():
-            return send_from_directory(PAGES_DIR, path)
+            return serve_page(path)
 
         full_path = FRONTEND_DIR / path
         if full_path.is_file():
@@ -533,14 +758,15 @@ def create_app() -> Flask:
         if len(password) < 8:
             return jsonify({"error": "password_too_short"}), 400
 
-        pwd_hash = generate_password_hash(password)
+        with stage("password_hash"):
+            pwd_hash = passwords.hash(password)
 
         try:
             with get_conn() as conn:
                 user_id = exec_one(
                     conn,
-                    "INSERT INTO users (username, email, password_hash) VALUES (?,?,?)",
-                    (username, email, pwd_hash),
+                    "INSERT INTO users (username, email, password_hash, username_norm, email_norm) VALUES (?,?,?,?,?)",
+                    (username, email, pwd_hash, normalize_identifier(username), normalize_identifier(email)),
                 )
         except Exception:
             # Most likely email uniqueness violation.
@@ -560,24 +786,39 @@ def create_app() -> Flask:
         if len(password) < 8:
             return jsonify({"error": "password_invalid"}), 400
 
+        # Two indexed point lookups; emails always contain "@", usernames rarely do.
+        key = normalize_identifier(identifier)
         with get_conn() as conn:
-            row = query_one(
-                conn,
-                """
-                SELECT id, username, email, password_hash
-                FROM users
-                WHERE lower(email) = lower(?) OR lower(username) = lower(?)
-                LIMIT 1
-                """,
-                (identifier, identifier),
-            )
+            row = None
+            if "@" in key:
+                row = query_one(
+                    conn, "SELECT id, username, email, password_hash FROM users WHERE email_norm = ?", (key,)
+                )
+            if row is None:
+                row = query_one(
+                    conn,
+                    "SELECT id, username, email, password_hash FROM users WHERE username_norm = ? ORDER BY id LIMIT 1",
+                    (key,),
+                )
 
         if row is None:
             return jsonify({"error": "invalid_credentials", "message": "Unknown email/username or wrong password."}), 401
 
-        if not check_password_hash(row["password_hash"], password):
+        with stage("password_hash"):
+            valid = passwords.verify(row["password_hash"], password)
+        if not valid:
             return jsonify({"error": "invalid_credentials", "message": "Unknown email/username or wrong password."}), 401
 
+        # Hash cost changed since this password was stored: upgrade it now that we know it.
+        if passwords.needs_rehash(row["password_hash"]):
+            try:
+                with stage("password_hash"):
+                    new_hash = passwords.hash(password)
+                with get_conn() as conn:
+                    conn.execute("UPDATE users SET password_hash = ? WHERE id = ?", (new_hash, row["id"]))
+            except HasherBusyError:
+                pass  # try again on a later login
+
         session.clear()
         session["user_id"] = int(row["id"])
         session.permanent = remember
@@ -589,6 +830,40 @@ def create_app() -> Flask:
         session.clear()
         return jsonify({"ok": True})
 
+    @app.get("/api/health")
+    def api_health():
+        db_status = db_pool.health_check()
+        return jsonify({
+            "ok": db_status["ok"],
+            "db": db_status,
+            "llm_cache": llm_cache.stats() if llm_cache is not None else None,
+            "llm": LLM_BACKEND.stats(),
+            "password_hashing": passwords.stats(),
+        }), 200 if db_status["ok"] else 503
+
+    @app.get("/api/metrics")
+    def api_metrics():
+        """Stage/request histograms and pool/cache counters in Prometheus text format."""
+        pool = db_pool.stats()
+        extra = [
+            ("ledgerly_db_pool_size", "gauge", "Configured pooled connections.", pool["size"]),
+            ("ledgerly_db_pool_open", "gauge", "Open pooled connections.", pool["open"]),
+            ("ledgerly_db_pool_idle", "gauge", "Idle pooled connections.", pool["idle"]),
+        ]
+        if llm_cache is not None:
+            cache = llm_cache.stats()
+            extra += [
+                ("ledgerly_llm_cache_hits_total", "counter", "LLM response cache hits.", cache["hits"]),
+                ("ledgerly_llm_cache_misses_total", "counter", "LLM response cache misses.", cache["misses"]),
+            ]
+        if LLM_BACKEND.breaker is not None:
+            extra.append((
+                "ledgerly_llm_circuit_open", "gauge",
+                "1 while the LLM circuit breaker sends extraction to the regex fallback.",
+                int(LLM_BACKEND.breaker.state != "closed"),
+            ))
+        return Response(metrics.render(extra), mimetype="text/plain; version=0.0.4")
+
     @app.get("/api/me")
     def api_me():
         user_id = current_user_id()
@@ -607,49 +882,355 @@ def create_app() -> Flask:
     # -------------------------
     # Example data API (ledger entries)
     # -------------------------
+    def parse_entry_filters():
+        """Read ``entry_type`` and ``from``/``to`` (YYYY-MM-DD) query params.
+
+        Returns (filters, None) or (None, error response).
+        """
+        entry_type = (request.args.get("entry_type") or "").strip().lower() or None
+        if entry_type is not None and entry_type not in {"income", "expense"}:
+            return None, (jsonify({"error": "entry_type_invalid"}), 400)
+
+        date_from = request.args.get("from")
+        date_to = request.args.get("to")
+        try:
+            if date_from:
+                date_from = date.fromisoformat(date_from).isoformat()
+            if date_to:
+                date_to = date.fromisoformat(date_to).isoformat()
+        except ValueError:
+            return None, (jsonify({"error": "date_invalid", "message": "Dates must be YYYY-MM-DD."}), 400)
+
+        return {"entry_type": entry_type, "from": date_from or None, "to": date_to or None}, None
+
+    def entry_filter_sql(user_id: int, filters: dict) -> tuple[list[str], list]:
+        """WHERE clauses and params for the user's entries matching ``filters`` (dates on created_at)."""
+        where = ["user_id = ?"]
+        params: list = [user_id]
+        if filters["from"]:
+            where.append("created_at >= ?")
+            params.append(filters["from"])
+        if filters["to"]:
+            where.append("created_at < date(?, '+1 day')")
+            params.append(filters["to"])
+        if filters["entry_type"]:
+            where.append("entry_type = ?")
+            params.append(filters["entry_type"])
+        return where, params
+
     @app.get("/api/entries")
     def api_list_entries():
+        """List entries newest-first with keyset pagination.
+
+        Query params: ``limit`` (default 50, max 200), ``before_id`` (cursor from
+        ``next_before_id``), ``entry_type`` and ``from``/``to`` (YYYY-MM-DD, on
+        ``created_at``). ``totals`` cover every entry in the date range, not just
+        the returned page.
+        """
         user_id = require_login()
         if not user_id:
             return jsonify({"error": "unauthorized"}), 401
 
+        try:
+            limit = int(request.args.get("limit", ENTRIES_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"error": "limit_invalid"}), 400
+        limit = max(1, min(limit, ENTRIES_MAX_PAGE_SIZE))
+
+        before_id = request.args.get("before_id")
+        if before_id is not None:
+            try:
+                before_id = int(before_id)
+            except ValueError:
+                return jsonify({"error": "before_id_invalid"}), 400
+
+        filters, error = parse_entry_filters()
+        if error is not None:
+            return error
+        page_where, page_params = entry_filter_sql(user_id, filters)
+        date_from, date_to = filters["from"], filters["to"]
+        if before_id is not None:
+            page_where.append("id < ?")
+            page_params.append(before_id)
+
         with get_conn() as conn:
             rows = query_all(
                 conn,
-                "SELECT id, entry_type, amount, note, created_at FROM entries WHERE user_id = ? ORDER BY id DESC",
-                (user_id,),
+                f"""SELECT id, entry_type, amount, note, created_at FROM entries
+                    WHERE {' AND '.join(page_where)} ORDER BY id DESC LIMIT ?""",
+                (*page_params, limit + 1),
             )
+            # Totals come from the rollup table, so they cost O(periods), not O(entries).
+            totals = rollup_totals(conn, user_id, date_from, date_to)
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        return jsonify({
+            "ok": True,
+            "entries": [dict(r) for r in rows],
+            "has_more": has_more,
+            "next_before_id": int(rows[-1]["id"]) if has_more else None,
+            "totals": totals,
+        })
+
+    @app.get("/api/entries/export")
+    def api_export_entries():
+        """Stream the ledger as CSV or JSONL (``?format=csv|jsonl``), oldest first.
+
+        Accepts the same ``entry_type``/``from``/``to`` filters as /api/entries.
+        Rows are read in keyset pages (``id > last id``) and gzip-compressed on
+        the fly when the client accepts it, so memory stays flat for any ledger
+        size. Each page checks a pooled connection out and back in, so a slow
+        download doesn't hold one for its whole duration.
+        """
+        user_id = require_login()
+        if not user_id:
+            return jsonify({"error": "unauthorized"}), 401
 
-        return jsonify({"ok": True, "entries": [dict(r) for r in rows]})
-
-    @app.post("/api/entries")
-    def api_create_entry():
+        fmt = (request.args.get("format") or "csv").strip().lower()
+        if fmt not in {"csv", "jsonl"}:
+            return jsonify({"error": "format_invalid", "message": "format must be csv or jsonl"}), 400
+
+        filters, error = parse_entry_filters()
+        if error is not None:
+            return error
+        where, params = entry_filter_sql(user_id, filters)
+        sql = (
+            f"SELECT {', '.join(EXPORT_COLUMNS)} FROM entries WHERE {' AND '.join(where)} AND id > ?"
+            " ORDER BY id LIMIT ?"
+        )
+        use_gzip = request.accept_encodings["gzip"] > 0
+
+        def render():
+            if fmt == "csv":
+                buf = io.StringIO()
+                writer = csv.writer(buf)
+                writer.writerow(EXPORT_COLUMNS)
+                yield buf.getvalue()
+            last_id = 0
+            while True:
+                with get_conn() as conn:
+                    rows = query_all(conn, sql, (*params, last_id, EXPORT_CHUNK_SIZE))
+                if not rows:
+                    return
+                last_id = rows[-1]["id"]
+                batch: list[str] = []
+                for row in rows:
+                    if fmt == "csv":
+                        buf.seek(0)
+                        buf.truncate()
+                        writer.writerow(tuple(row))
+                        batch.append(buf.getvalue())
+                    else:
+                        batch.append(json.dumps(dict(row), ensure_ascii=False) + "\n")
+                yield "".join(batch)
+                if len(rows) < EXPORT_CHUNK_SIZE:
+                    return
+
+        def encode():
+            if not use_gzip:
+                for text in render():
+                    yield text.encode("utf-8")
+                return
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+            for text in render():
+                data = compressor.compress(text.encode("utf-8"))
+                if data:
+                    yield data
+            yield compressor.flush()
+
+        headers = {
+            "Content-Disposition": f"attachment; filename=ledgerly-entries.{fmt}",
+            "Vary": "Accept-Encoding",
+        }
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+        mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+        return Response(encode(), mimetype=mimetype, headers=headers)
+
+    @app.post("/api/entries/import")
+    def api_import_entries():
+        """Bulk-load past books from CSV or JSONL.
+
+        Send the file as multipart ``file`` or as the raw body; the format
+        comes from ``?format=``, the filename or the content type. Rows are
+        parsed as a stream and validated like ``POST /api/entries``. GST
+        columns and a ``created_at`` date are optional. Valid rows are inserted
+        with batched executemany calls in a single transaction; invalid rows are
+        skipped and reported with their line number.
+        """
         user_id = require_login()
         if not user_id:
             return jsonify({"error": "unauthorized"}), 401
 
-        data = request.get_json(silent=True) or {}
-        entry_type = (data.get("entry_type") or "").strip().lower()
-        note = (data.get("note") or "").strip() or None
-        amount = data.get("amount")
+        upload = request.files.get("file")
+        stream = upload.stream if upload is not None else request.stream
+        name = (upload.filename or "") if upload is not None else ""
+        fmt = (request.args.get("format") or "").strip().lower()
+        if not fmt:
+            content_type = (upload.mimetype if upload is not None else request.mimetype) or ""
+            if name.lower().endswith((".jsonl", ".ndjson")) or "ndjson" in content_type or "jsonl" in content_type:
+                fmt = "jsonl"
+            else:
+                fmt = "csv"
+        if fmt not in {"csv", "jsonl"}:
+            return jsonify({"error": "format_invalid", "message": "format must be csv or jsonl"}), 400
+
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            records = ((reader.line_num, row) for row in reader)
+        else:
+            records = (
+                (line_no, line)
+                for line_no, line in enumerate(text, start=1)
+                if line.strip()
+            )
+
+        errors: list[dict] = []
+        error_count = 0
+        imported = 0
+        periods: set[str] = set()
+        insert_sql = f"INSERT INTO entries (user_id, {', '.join(IMPORT_COLUMNS)}) VALUES (?{', ?' * len(IMPORT_COLUMNS)})"
+
+        try:
+            with get_conn() as conn:
+                begin_write(conn)
+                # Holding the write lock, every id above this one belongs to this import.
+                last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM entries").fetchone()[0]
+                batch: list[tuple] = []
+                for line_no, record in records:
+                    if fmt == "jsonl":
+                        try:
+                            record = json.loads(record)
+                        except ValueError:
+                            record = None
+                        if not isinstance(record, dict):
+                            error_count += 1
+                            if len(errors) < IMPORT_MAX_ERRORS:
+                                errors.append({"line": line_no, "error": "json_invalid"})
+                            continue
+
+                    fields, error = validate_import_row(record)
+                    if error is not None:
+                        error_count += 1
+                        if len(errors) < IMPORT_MAX_ERRORS:
+                            errors.append({"line": line_no, "error": error})
+                        continue
 
-        if entry_type not in {"income", "expense"}:
-            return jsonify({"error": "entry_type_invalid"}), 400
+                    batch.append((user_id, *(fields[c] for c in IMPORT_COLUMNS)))
+                    if fields["bill_date"]:
+                        periods.add(fields["bill_date"])
+                    if len(batch) >= IMPORT_BATCH_SIZE:
+                        conn.executemany(insert_sql, batch)
+                        imported += len(batch)
+                        batch = []
+                if batch:
+                    conn.executemany(insert_sql, batch)
+                    imported += len(batch)
+
+                if imported:
+                    add_to_rollups(conn, "user_id = ? AND id > ?", (user_id, last_id))
+                    for bill_date in periods:
+                        invalidate_gst_period(conn, user_id, bill_date)
+        except UnicodeDecodeError:
+            return jsonify({"error": "encoding_invalid", "message": "Import files must be UTF-8."}), 400
+        except csv.Error as e:
+            return jsonify({"error": "csv_invalid", "message": str(e)}), 400
+        except Exception as e:
+            import traceback
+            print("[ledgerly] import_failed:", e)
+            traceback.print_exc()
+            return jsonify({"error": "import_failed", "message": str(e)}), 500
 
-        if amount is None:
-            return jsonify({"error": "amount_invalid"}), 400
+        return jsonify({
+            "ok": True,
+            "imported": imported,
+            "failed": error_count,
+            "errors": errors,
+            "errors_truncated": error_count > len(errors),
+        })
+
+    # -------------------------
+    # Insights API (served from entry_rollups)
+    # -------------------------
+    @app.get("/api/insights")
+    def api_insights():
+        """Per-day, per-month and per-vendor income/expense/GST totals.
+
+        Query params: ``days`` (default 30, max 366), ``months`` (default 12,
+        max 120) and ``vendors`` (top-N by expense, default 10, max 100).
+        """
+        user_id = require_login()
+        if not user_id:
+            return jsonify({"error": "unauthorized"}), 401
 
         try:
-            amount_val = float(amount)
-        except Exception:
-            return jsonify({"error": "amount_invalid"}), 400
+            days = max(1, min(int(request.args.get("days", 30)), 366))
+            months = max(1, min(int(request.args.get("months", 12)), 120))
+            vendors = max(1, min(int(request.args.get("vendors", 10)), 100))
+        except ValueError:
+            return jsonify({"error": "range_invalid"}), 400
+
+        today = datetime.now(timezone.utc).date()  # created_at buckets are UTC
+        day_since = (today - timedelta(days=days - 1)).isoformat()
+        month_index = today.year * 12 + today.month - 1 - (months - 1)
+        month_since = f"{month_index // 12:04d}-{month_index % 12 + 1:02d}"
 
         with get_conn() as conn:
+            daily = rollup_series(conn, user_id, "day", since=day_since)
+            monthly = rollup_series(conn, user_id, "month", since=month_since)
+            by_vendor = rollup_series(conn, user_id, "vendor", limit=vendors)
+            totals = rollup_totals(conn, user_id)
+
+        return jsonify({
+            "ok": True,
+            "totals": totals,
+            "daily": daily,
+            "monthly": monthly,
+            "vendors": by_vendor,
+        })
+
+    # -------------------------
+    # GST summary API
+    # -------------------------
+    @app.get("/api/gst/summary")
+    def api_gst_summary():
+        """GSTR-style input tax credit summary for ``?period=YYYY-MM`` (defaults to the current month)."""
+        user_id = require_login()
+        if not user_id:
+            return jsonify({"error": "unauthorized"}), 401
+
+        period = (request.args.get("period") or datetime.now(timezone.utc).strftime("%Y-%m")).strip()
+        if parse_period(period) is None:
+            return jsonify({"error": "period_invalid", "message": "period must be YYYY-MM"}), 400
+
+        with get_conn() as conn:
+            summary, cached = gst_summary(conn, user_id, period, begin_write)
+
+        return jsonify({"ok": True, "cached": cached, "summary": summary})
+
+    @app.post("/api/entries")
+    def api_create_entry():
+        user_id = require_login()
+        if not user_id:
+            return jsonify({"error": "unauthorized"}), 401
+
+        data = request.get_json(silent=True) or {}
+        fields, error = validate_entry(data)
+        if error is not None:
+            return jsonify({"error": error}), 400
+        entry_type, amount_val, note = fields["entry_type"], fields["amount"], fields["note"]
+
+        with get_conn() as conn:
+            begin_write(conn)
             entry_id = exec_one(
                 conn,
                 "INSERT INTO entries (user_id, entry_type, amount, note) VALUES (?,?,?,?)",
                 (user_id, entry_type, amount_val, note),
             )
+            add_to_rollups(conn, "id = ?", (entry_id,))
 
         return jsonify({"ok": True, "entry": {"id": entry_id, "entry_type": entry_type, "amount": amount_val, "note": note}})
     
@@ -672,24 +1253,20 @@ def create_app() -> Flask:
         try:
             extracted = None
             
-            # Try Gemini extraction first (if API key available)
-            if GEMINI_API_KEY:
-                try:
-                    prompt = VOICE_EXTRACTION_PROMPT.format(transcript=transcript)
-                    model_name = GEMINI_MODEL if 'GEMINI_MODEL' in globals() else "gemini-1.5-flash"
-                    model = genai.GenerativeModel(model_name)
-                    # Helper for response handling
-                    response = model.generate_content(prompt)
-                    raw = response.text or ""
-                    cleaned = _clean_json_text(raw)
-                    extracted = json.loads(cleaned)
-                except Exception as e:
-                    print(f"Gemini extraction failed: {e}, falling back to simple extraction")
-                    extracted = None
+            # Try the configured LLM backend first
+            try:
+                prompt = VOICE_EXTRACTION_PROMPT.format(transcript=transcript)
+                with stage("llm_voice"):
+                    extracted = _generate_json(
+                        "voice", PROMPT_VERSIONS["voice"], prompt, context={"transcript": transcript}, cache=llm_cache
+                    )
+            except Exception as e:
+                print(f"[ledgerly] {LLM_BACKEND.name} voice extraction failed: {e}, falling back to simple extraction")
+                extracted = None
 
             # Fallback to simple regex extraction
             if not extracted:
-                extracted = extract_voice_data_simple(transcript)
+                extracted = regex_extract_voice(transcript)
 
             # Validate extracted data
             entry_type = extracted.get("entry_type", "income")
@@ -699,13 +1276,7 @@ def create_app() -> Flask:
             amount = extracted.get("amount", 0)
             if not amount or amount <= 0:
                 # Try to extract amount from transcript directly
-                import re
-                amount_match = re.search(r"([\d,]+\.?\d*)", transcript)
-                if amount_match:
-                    try:
-                        amount = float(amount_match.group(1).replace(",", ""))
-                    except ValueError:
-                        pass
+                amount = detect_voice_amount(transcript)
 
             if amount <= 0:
                 return jsonify({"error": "amount_not_found", "message": "Could not extract amount from transcript."}), 400
@@ -730,11 +1301,13 @@ def create_app() -> Flask:
 
             # Create ledger entry
             with get_conn() as conn:
+                begin_write(conn)
                 entry_id = exec_one(
                     conn,
                     "INSERT INTO entries (user_id, entry_type, amount, note) VALUES (?,?,?,?)",
                     (user_id, entry_type, float(amount), note),
                 )
+                add_to_rollups(conn, "id = ?", (entry_id,))
 
                 # Fetch the created entry
                 row = query_one(
@@ -889,153 +1462,328 @@ def create_app() -> Flask:
     # -------------------------
     # Bills / OCR API
     # -------------------------
+    # Full bill projection for single-bill reads; listings leave out the heavy
+    # ocr_text/items_json columns.
+    BILL_FIELDS = (
+        "id", "filename", "s3_url", "ocr_text", "detected_amount", "vendor_name", "bill_date",
+        "total_amount", "gst_amount", "items_json", "confidence", "status", "error", "error_message", "created_at",
+    )
+    BILL_LIST_FIELDS = tuple(f for f in BILL_FIELDS if f not in {"ocr_text", "items_json"})
+    BILL_COLUMNS = ", ".join(BILL_FIELDS)
+    BILL_LIST_COLUMNS = ", ".join(BILL_LIST_FIELDS)
+    BILLS_PAGE_SIZE = 50
+    BILLS_MAX_PAGE_SIZE = 200
+
+    def with_image_urls(bill: dict) -> dict:
+        """Add ``thumbnail_url`` / ``preview_url`` (WEBP renditions) next to ``s3_url``."""
+        if bill.get("s3_url"):
+            bill["thumbnail_url"] = f"{bill['s3_url']}?size=thumb"
+            bill["preview_url"] = f"{bill['s3_url']}?size=preview"
+        return bill
+
+    def serialize_bill(row) -> dict:
+        """Full bill for /wait and /events: image URLs plus ``items`` decoded from ``items_json``."""
+        bill = with_image_urls(dict(row))
+        bill["items"] = json.loads(bill["items_json"]) if bill.get("items_json") else []
+        return bill
+
+    def fail_bill(bill_id: int, error: str, message: str) -> None:
+        with get_conn() as conn:
+            conn.execute(
+                "UPDATE bills SET status = 'failed', error = ?, error_message = ? WHERE id = ? AND status = 'processing'",
+                (error, message, bill_id),
+            )
+
+    def find_cached_extraction(content_hash: str | None):
+        """Return (ocr_text, structured) from an earlier bill with identical bytes, if any.
+
+        Only LLM extractions made with the current ``extraction_version()`` are
+        reused, so regex fallbacks (no key, provider errors, open circuit) and
+        results from another backend or prompt version are extracted again.
+        """
+        if not content_hash:
+            return None
+        with get_conn() as conn:
+            row = query_one(
+                conn,
+                """SELECT ocr_text, extraction_json FROM bills
+                   WHERE content_hash = ? AND status = 'done' AND extraction_json IS NOT NULL
+                     AND extraction_version = ?
+                   ORDER BY id DESC LIMIT 1""",
+                (content_hash, extraction_version()),
+            )
+        if row is None:
+            return None
+        try:
+            structured = json.loads(row["extraction_json"])
+        except (TypeError, ValueError):
+            return None
+        return row["ocr_text"] or "", structured
+
+    def extract_bill(bill_id: int, local_path: Path):
+        """OCR and structure a stored bill file; returns (ocr_text, structured) or None after failing the bill."""
+        from ocr import ocr_bill_file
+
+        result = ocr_bill_file(str(local_path), want_image=LLM_BACKEND.wants_image)
+        if "error" in result:
+            fail_bill(bill_id, result["error"], result["message"])
+            return None
+        ocr_text = result["ocr_text"]
+        return ocr_text, structure_bill(result.get("image"), ocr_text, llm_cache)
+
+    def save_bill_result(conn, bill_id: int, user_id: int, ocr_text: str, structured: dict) -> dict | None:
+        """Write extraction results to the bill row (status 'done') and auto-create its ledger entry.
+
+        Call inside a transaction so the entry and its rollups land together.
+        Returns None, writing nothing, when the bill already left 'processing'
+        (another process finished a requeued copy of the job first).
+        """
+        vendor_name = structured.get("vendor_name")
+        vendor_gstin = structured.get("vendor_gstin")
+        bill_number = structured.get("bill_number")
+        bill_date = normalize_bill_date(structured.get("bill_date"))
+        total_amount = structured.get("total_amount")
+        subtotal = structured.get("subtotal")  # Taxable value
+        cgst_amount = structured.get("cgst_amount")
+        sgst_amount = structured.get("sgst_amount")
+        igst_amount = structured.get("igst_amount")
+        gst_amount = (cgst_amount or 0) + (sgst_amount or 0) + (igst_amount or 0)
+        items = structured.get("items")
+        confidence = structured.get("confidence")
+        items_json = json.dumps(items) if items is not None else None
+
+        # Amount as printed on the bill; shares the cached scan with the regex fallback
+        detected_amount = detect_amount(ocr_text)
+
+        # Claim the 'done' transition first; the entry is only created by the winner.
+        finished = conn.execute(
+            """UPDATE bills SET ocr_text = ?, detected_amount = ?, vendor_name = ?, bill_date = ?,
+                   total_amount = ?, gst_amount = ?, items_json = ?, confidence = ?,
+                   extraction_json = ?, extraction_version = ?, status = 'done',
+                   lease_owner = NULL, lease_expires_at = NULL
+               WHERE id = ? AND status = 'processing'""",
+            (ocr_text, detected_amount, vendor_name, bill_date, total_amount, gst_amount,
+             items_json, confidence, json.dumps(structured), structured.get("extraction_version"), bill_id),
+        ).rowcount
+        if not finished:
+            return None
+
+        # Auto-create ledger entry if we have a valid total amount
+        entry_id = None
+        if total_amount and total_amount > 0:
+            note = f"Bill from {vendor_name or 'Unknown Vendor'}"
+            entry_id = exec_one(
+                conn,
+                """INSERT INTO entries (
+                    user_id, entry_type, amount, note, 
+                    vendor_name, vendor_gstin, bill_number, bill_date,
+                    taxable_amount, cgst_amount, sgst_amount, igst_amount
+                ) VALUES (?, 'expense', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    user_id, total_amount, note,
+                    vendor_name, vendor_gstin, bill_number, bill_date,
+                    subtotal, cgst_amount, sgst_amount, igst_amount
+                )
+            )
+            add_to_rollups(conn, "id = ?", (entry_id,))
+            invalidate_gst_period(conn, user_id, bill_date)
+
+        return {
+            "detected_amount": detected_amount,
+            "vendor_name": vendor_name,
+            "bill_date": bill_date,
+            "total_amount": total_amount,
+            "gst_amount": gst_amount,
+            "confidence": confidence,
+            "entry_id": entry_id,
+        }
+
+    def process_bill_job(bill_id: int, user_id: int, local_path: Path, content_hash: str | None = None) -> None:
+        """Run PDF conversion, OCR, extraction and ledger-entry creation for a bill.
+
+        Runs on the bill worker pool; moves the bill row to 'done' or 'failed'.
+        Bills whose bytes were already processed reuse the stored OCR text and
+        extraction instead of calling Tesseract/Gemini again.
+        """
+        outcome = "failed"
+        with metrics.trace(f"bill {bill_id}") as trace:
+            try:
+                with stage("extraction_cache"):
+                    extracted = find_cached_extraction(content_hash)
+                extracted = extracted or extract_bill(bill_id, local_path)
+                if extracted is None:
+                    return
+                ocr_text, structured = extracted
+
+                with get_conn() as conn:
+                    begin_write(conn)
+                    with stage("save"):
+                        saved = save_bill_result(conn, bill_id, user_id, ocr_text, structured)
+                outcome = "done" if saved is not None else "duplicate"
+                if saved is None:
+                    print(f"[ledgerly] bill {bill_id} was already finished by another worker; result discarded")
+            except Exception as e:
+                import traceback
+                print("[ledgerly] bill processing failed:", e)
+                traceback.print_exc()
+                fail_bill(bill_id, "processing_failed", str(e))
+            finally:
+                metrics.observe("ledgerly_bill_job_seconds", trace.elapsed(), outcome=outcome)
+                log_if_slow(trace, f"bill job {bill_id} ({outcome})")
+
+    bill_jobs = BillJobQueue(process_bill_job, max_workers=int(os.environ.get("LEDGERLY_BILL_WORKERS", "2")))
+
+    # Identifies this process in bill leases.
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    lease_modifier = f"+{BILL_LEASE_SECONDS} seconds"
+
+    def renew_bill_leases() -> None:
+        bill_ids = bill_jobs.pending_ids()
+        if not bill_ids:
+            return
+        with get_conn() as conn:
+            conn.execute(
+                f"""UPDATE bills SET lease_owner = ?, lease_expires_at = datetime('now', ?)
+                    WHERE status = 'processing' AND id IN ({", ".join("?" * len(bill_ids))})""",
+                (worker_id, lease_modifier, *bill_ids),
+            )
+
+    def recover_interrupted_bills() -> None:
+        """Requeue 'processing' bills whose lease expired; fail them past BILL_REQUEUE_LIMIT.
+
+        A live process keeps renewing the leases of its bills, so only bills
+        of a process that died (or rows from before leases existed) qualify.
+        Claiming a row takes a new lease in the same UPDATE, so exactly one
+        process gets it.
+        """
+        with get_conn() as conn:
+            rows = query_all(
+                conn,
+                """SELECT id, user_id, s3_key, content_hash, requeue_count FROM bills
+                   WHERE status = 'processing' AND (lease_expires_at IS NULL OR lease_expires_at < datetime('now'))""",
+            )
+        requeued = failed = 0
+        for row in rows:
+            with get_conn() as conn:
+                claimed = conn.execute(
+                    """UPDATE bills SET requeue_count = requeue_count + 1,
+                           lease_owner = ?, lease_expires_at = datetime('now', ?)
+                       WHERE id = ? AND status = 'processing'
+                         AND (lease_expires_at IS NULL OR lease_expires_at < datetime('now'))""",
+                    (worker_id, lease_modifier, row["id"]),
+                ).rowcount
+            if not claimed:
+                continue
+            local_path = Path(row["s3_key"])
+            if row["requeue_count"] >= BILL_REQUEUE_LIMIT or not local_path.is_file():
+                fail_bill(row["id"], "processing_interrupted",
+                          "Processing was interrupted by a server restart. Please upload the bill again.")
+                failed += 1
+            else:
+                bill_jobs.submit(row["id"], row["user_id"], local_path, row["content_hash"])
+                requeued += 1
+        if requeued or failed:
+            print(f"[ledgerly] interrupted bills: {requeued} requeued, {failed} failed")
+
+    def bill_lease_loop() -> None:
+        while True:
+            try:
+                renew_bill_leases()
+                recover_interrupted_bills()
+            except Exception as e:
+                print(f"[ledgerly] bill lease maintenance failed: {e}")
+            time.sleep(max(1.0, BILL_LEASE_SECONDS / 3))
+
+    bill_lease_lock = threading.Lock()
+    bill_lease_started = threading.Event()
+
+    # Started by the first request rather than at startup: the debug reloader
+    # runs create_app in its watcher process too, which must not take the jobs.
+    @app.before_request
+    def start_bill_leases():
+        if bill_lease_started.is_set():
+            return
+        with bill_lease_lock:
+            if not bill_lease_started.is_set():
+                threading.Thread(target=bill_lease_loop, name="ledgerly-bill-leases", daemon=True).start()
+                bill_lease_started.set()
+
+    def fetch_bill(bill_id: int, user_id: int, columns: str = BILL_COLUMNS):
+        with get_conn() as conn:
+            return query_one(
+                conn,
+                f"SELECT {columns} FROM bills WHERE id = ? AND user_id = ?",
+                (bill_id, user_id),
+            )
+
+    def wait_for_bill(bill_id: int, user_id: int, timeout: float):
+        """Block until the bill leaves 'processing' or the timeout expires; return the latest row."""
+        deadline = time.monotonic() + timeout
+        # Poll the status only; the full row is read once at the end.
+        row = fetch_bill(bill_id, user_id, "id, status")
+        while row is not None and row["status"] == "processing":
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Jobs owned by this process signal completion; otherwise poll the row.
+            if bill_jobs.wait(bill_id, remaining) is None:
+                time.sleep(min(0.5, remaining))
+            row = fetch_bill(bill_id, user_id, "id, status")
+        if row is None:
+            return None
+        return fetch_bill(bill_id, user_id)
+
+    def parse_wait_timeout() -> float:
+        try:
+            timeout = float(request.args.get("timeout", BILL_WAIT_TIMEOUT))
+        except ValueError:
+            timeout = BILL_WAIT_TIMEOUT
+        return max(0.0, min(timeout, BILL_WAIT_TIMEOUT))
+
     @app.post("/api/bills/upload")
     def api_upload_bill():
-        """Upload a bill image locally and extract text via OCR."""
+        """Upload a bill image locally and queue it for OCR/extraction.
+
+        Returns 202 with the bill id; poll ``GET /api/bills/<id>``, long-poll
+        ``/api/bills/<id>/wait`` or subscribe to ``/api/bills/<id>/events``.
+        """
         user_id = require_login()
         if not user_id:
             return jsonify({"error": "unauthorized"}), 401
 
-        if "file" not in request.files:
+        # Reject on Content-Length before the body is read.
+        if UPLOAD_MAX_BYTES and (request.content_length or 0) > UPLOAD_MAX_BYTES + MULTIPART_SLACK_BYTES:
+            raise RequestEntityTooLarge()
+
+        # Parsing the form streams the file part to disk (see SpoolingRequest).
+        with stage("receive_upload"):
+            file = request.files.get("file")
+        if file is None:
             return jsonify({"error": "no_file"}), 400
 
-        file = request.files["file"]
         if file.filename == "":
             return jsonify({"error": "empty_filename"}), 400
 
-        if not allowed_file(file.filename):
-            return jsonify({"error": "invalid_file_type", "message": "Only image files (PNG, JPG, PDF, etc.) are allowed."}), 400
-
         try:
-            # Secure the filename and create unique storage key
+            # Store content-addressed: identical bytes map to one file on disk.
+            # The file type comes from its magic bytes, not the client's name.
             original_filename = secure_filename(file.filename)
-            unique_id = uuid.uuid4().hex
-            stored_filename = f"{unique_id}_{original_filename}"
-            local_path = BILLS_UPLOAD_DIR / stored_filename
-            public_url = f"/uploads/bills/{stored_filename}"
-
-            # Save locally
-            file.save(local_path)
+            with stage("store_upload"):
+                local_path, content_hash = store_upload(file.stream, BILLS_UPLOAD_DIR, UPLOAD_MAX_BYTES)
+            public_url = f"/uploads/bills/{local_path.name}"
 
-            # Insert bill record with status 'processing'
+            # Insert bill record with status 'processing', leased to this process
             with get_conn() as conn:
                 bill_id = exec_one(
                     conn,
-                    """INSERT INTO bills (user_id, filename, s3_key, s3_url, status)
-                       VALUES (?, ?, ?, ?, 'processing')""",
-                    (user_id, original_filename, str(local_path), public_url),
+                    """INSERT INTO bills (user_id, filename, s3_key, s3_url, content_hash, status,
+                                          lease_owner, lease_expires_at)
+                       VALUES (?, ?, ?, ?, ?, 'processing', ?, datetime('now', ?))""",
+                    (user_id, original_filename, str(local_path), public_url, content_hash,
+                     worker_id, lease_modifier),
                 )
 
-                # Ensure image path (convert PDF first pages to image)
-                image_path = pdf_to_image(local_path) if local_path.suffix.lower() == ".pdf" else local_path
-
-                # If conversion failed (still PDF), return clear error about Poppler setup
-                if image_path.suffix.lower() == ".pdf":
-                    return jsonify({
-                        "error": "pdf_conversion_failed",
-                        "message": (
-                            "Could not convert PDF to image. Install Poppler and set POPPLER_PATH to its bin folder, "
-                            "then restart the server."
-                        )
-                    }), 500
-
-                # Run Tesseract OCR on local file
-                try:
-                    image = Image.open(image_path)
-                    ocr_text = pytesseract.image_to_string(image)
-                except pytesseract.TesseractNotFoundError:
-                    return jsonify({
-                        "error": "tesseract_missing",
-                        "message": (
-                            "Tesseract executable not found. Set TESSERACT_CMD to your tesseract.exe path "
-                            "or add it to PATH, then restart the server."
-                        )
-                    }), 500
-                except Exception as e:
-                    return jsonify({
-                        "error": "ocr_failed",
-                        "message": f"Failed to read image/PDF: {e}"
-                    }), 500
-
-            # Use Gemini Vision to structure data (optional)
-            structured = run_gemini_structured(image_path, ocr_text) or {}
-
-            # If LLM/gemini returned nothing useful, fall back to OCR regex extraction
-            if not structured or (structured.get("total_amount") in (None, 0) and not structured.get("items")):
-                structured = _fallback_extract_from_ocr(ocr_text)
-
-            # Minimal item spotting heuristic: if no items but we have a total, create a single inferred line item
-            if structured.get("items") in (None, [], ()):  # empty items
-                total_val = structured.get("total_amount") or structured.get("detected_amount")
-                if total_val:
-                    structured["items"] = [{
-                        "description": "Inferred item",
-                        "hsn_code": None,
-                        "quantity": 1,
-                        "rate": total_val,
-                        "amount": total_val
-                    }]
-            
-            vendor_name = structured.get("vendor_name")
-            vendor_gstin = structured.get("vendor_gstin")
-            bill_number = structured.get("bill_number")
-            bill_date = structured.get("bill_date")
-            total_amount = structured.get("total_amount")
-            subtotal = structured.get("subtotal")  # Taxable value
-            cgst_amount = structured.get("cgst_amount")
-            sgst_amount = structured.get("sgst_amount")
-            igst_amount = structured.get("igst_amount")
-            gst_amount = (cgst_amount or 0) + (sgst_amount or 0) + (igst_amount or 0)
-            items = structured.get("items")
-            confidence = structured.get("confidence")
-            items_json = json.dumps(items) if items is not None else None
-
-            # Extract amount from OCR text (basic regex for Indian currency patterns)
-            detected_amount = None
-            # Match patterns like ₹1,234.56 or Rs. 1234 or 1,234.00 or just numbers
-            amount_patterns = [
-                r"(?:₹|Rs\.?|INR)\s*([\d,]+\.?\d*)",  # ₹1,234 or Rs. 1234
-                r"Total[:\s]*([\d,]+\.?\d*)",          # Total: 1234
-                r"Amount[:\s]*([\d,]+\.?\d*)",         # Amount: 1234
-                r"Grand\s*Total[:\s]*([\d,]+\.?\d*)",  # Grand Total: 1234
-                r"\b([\d,]+\.\d{2})\b",                # Generic decimal like 1234.00
-            ]
-            for pattern in amount_patterns:
-                match = re.search(pattern, ocr_text, re.IGNORECASE)
-                if match:
-                    amount_str = match.group(1).replace(",", "")
-                    try:
-                        detected_amount = float(amount_str)
-                        break
-                    except ValueError:
-                        continue
-
-            # Update bill record with OCR results
-            with get_conn() as conn:
-                conn.execute(
-                    """UPDATE bills SET ocr_text = ?, detected_amount = ?, vendor_name = ?, bill_date = ?,
-                           total_amount = ?, gst_amount = ?, items_json = ?, status = 'done'
-                       WHERE id = ?""",
-                    (ocr_text, detected_amount, vendor_name, bill_date, total_amount, gst_amount, items_json, bill_id),
-                )
-
-            # Auto-create ledger entry if we have a valid total amount
-            if total_amount and total_amount > 0:
-                with get_conn() as conn:
-                    note = f"Bill from {vendor_name or 'Unknown Vendor'}"
-                    exec_one(
-                        conn,
-                        """INSERT INTO entries (
-                            user_id, entry_type, amount, note, 
-                            vendor_name, vendor_gstin, bill_number, bill_date,
-                            taxable_amount, cgst_amount, sgst_amount, igst_amount
-                        ) VALUES (?, 'expense', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                        (
-                            user_id, total_amount, note,
-                            vendor_name, vendor_gstin, bill_number, bill_date,
-                            subtotal, cgst_amount, sgst_amount, igst_amount
-                        )
-                    )
+            bill_jobs.submit(bill_id, user_id, local_path, content_hash)
 
             return jsonify({
                 "ok": True,
@@ -1043,17 +1791,14 @@ def create_app() -> Flask:
                     "id": bill_id,
                     "filename": original_filename,
                     "s3_url": public_url,
-                    "ocr_text": ocr_text,
-                    "detected_amount": detected_amount,
-                    "vendor_name": vendor_name,
-                    "bill_date": bill_date,
-                    "total_amount": total_amount,
-                    "gst_amount": gst_amount,
-                    "items": items,
-                    "confidence": confidence,
-                    "status": "done",
-                }
-            })
+                    "status": "processing",
+                },
+                "status_url": f"/api/bills/{bill_id}",
+                "wait_url": f"/api/bills/{bill_id}/wait",
+                "events_url": f"/api/bills/{bill_id}/events",
+            }), 202
+        except UploadRejected as e:
+            return jsonify({"error": e.error, "message": e.message}), 400
         except Exception as e:
             # Log full error for debugging
             import traceback
@@ -1061,44 +1806,281 @@ def create_app() -> Flask:
             traceback.print_exc()
             return jsonify({"error": "upload_failed", "message": str(e)}), 500
 
+    @app.post("/api/bills/batch")
+    def api_upload_bills_batch():
+        """Upload many bills (multipart ``files`` and/or .zip archives) and process them together.
+
+        OCR runs in a process pool across cores, Gemini structuring with
+        bounded concurrency, and every bill/entry row is written in a single
+        transaction. Responds with a per-file status list.
+        """
+        user_id = require_login()
+        if not user_id:
+            return jsonify({"error": "unauthorized"}), 401
+
+        with stage("receive_upload"):
+            uploads = request.files.getlist("files") + request.files.getlist("file")
+        if not uploads:
+            return jsonify({"error": "no_file"}), 400
+
+        results: list[dict] = []
+        stored: list[tuple[dict, Path, str]] = []  # (result, local path, content hash)
+
+        def accept(name: str, stream) -> None:
+            result = {"filename": secure_filename(name) or "unnamed", "status": "skipped", "bill_id": None}
+            results.append(result)
+            if len(stored) >= BATCH_MAX_FILES:
+                result.update(error="batch_too_large", message=f"At most {BATCH_MAX_FILES} files per batch.")
+                return
+            try:
+                with stage("store_upload"):
+                    local_path, content_hash = store_upload(stream, BILLS_UPLOAD_DIR, UPLOAD_MAX_BYTES)
+            except UploadRejected as e:
+                result.update(error=e.error, message=e.message)
+                return
+            except RequestEntityTooLarge:
+                result.update(error="file_too_large", message=f"Bill files are limited to {UPLOAD_MAX_BYTES // (1024 * 1024)} MB.")
+                return
+            stored.append((result, local_path, content_hash))
+
+        try:
+            for upload in uploads:
+                name = upload.filename or ""
+                if name.lower().endswith(".zip"):
+                    try:
+                        with zipfile.ZipFile(upload.stream) as archive:
+                            for info in archive.infolist():
+                                if info.is_dir():
+                                    continue
+                                with archive.open(info) as member:
+                                    accept(Path(info.filename).name, member)
+                    except zipfile.BadZipFile:
+                        results.append({
+                            "filename": secure_filename(name), "status": "skipped", "bill_id": None,
+                            "error": "invalid_zip", "message": "Could not read zip archive.",
+                        })
+                else:
+                    accept(name, upload.stream)
+
+            # Identical files (within the batch or seen before) are extracted once.
+            extractions: dict[str, tuple[str, dict] | dict] = {}
+            pending: dict[str, Path] = {}
+            for _, local_path, content_hash in stored:
+                if content_hash in extractions or content_hash in pending:
+                    continue
+                cached = find_cached_extraction(content_hash)
+                if cached is not None:
+                    extractions[content_hash] = cached
+                else:
+                    pending[content_hash] = local_path
+
+            if pending:
+                # OCR runs in worker processes; only the batch total is visible here.
+                with stage("batch_extract"):
+                    from ocr import ocr_bill_file
+
+                    want_image = LLM_BACKEND.wants_image
+                    def submit_ocr(pool: ProcessPoolExecutor) -> dict:
+                        return {
+                            pool.submit(ocr_bill_file, str(path), want_image): content_hash
+                            for content_hash, path in pending.items()
+                        }
+
+                    ocr_pool = get_ocr_process_pool()
+                    with ThreadPoolExecutor(max_workers=max(1, GEMINI_BATCH_CONCURRENCY)) as llm_pool:
+                        try:
+                            ocr_futures = submit_ocr(ocr_pool)
+                        except BrokenProcessPool:
+                            # A worker died during an earlier batch; retry once on a new pool.
+                            discard_ocr_process_pool(ocr_pool)
+                            ocr_pool = get_ocr_process_pool()
+                            ocr_futures = submit_ocr(ocr_pool)
+                        llm_futures = {}
+                        # Start structuring each bill as soon as its OCR finishes.
+                        for future in as_completed(ocr_futures):
+                            content_hash = ocr_futures[future]
+                            try:
+                                ocr = future.result()
+                            except BrokenProcessPool as e:
+                                discard_ocr_process_pool(ocr_pool)
+                                ocr = {"error": "ocr_failed", "message": str(e)}
+                            except Exception as e:
+                                ocr = {"error": "ocr_failed", "message": str(e)}
+                            if "error" in ocr:
+                                extractions[content_hash] = ocr
+                                continue
+                            llm_future = llm_pool.submit(structure_bill, ocr.get("image"), ocr["ocr_text"], llm_cache)
+                            llm_futures[llm_future] = (content_hash, ocr["ocr_text"])
+                        for future in as_completed(llm_futures):
+                            content_hash, ocr_text = llm_futures[future]
+                            try:
+                                extractions[content_hash] = (ocr_text, future.result())
+                            except Exception as e:
+                                extractions[content_hash] = {"error": "processing_failed", "message": str(e)}
+
+            # One transaction for every bill row and auto-created entry.
+            with get_conn() as conn:
+                begin_write(conn)
+                for result, local_path, content_hash in stored:
+                    extracted = extractions[content_hash]
+                    public_url = f"/uploads/bills/{local_path.name}"
+                    if isinstance(extracted, dict):
+                        bill_id = exec_one(
+                            conn,
+                            """INSERT INTO bills (user_id, filename, s3_key, s3_url, content_hash, status, error, error_message)
+                               VALUES (?, ?, ?, ?, ?, 'failed', ?, ?)""",
+                            (user_id, result["filename"], str(local_path), public_url, content_hash,
+                             extracted["error"], extracted["message"]),
+                        )
+                        result.update(status="failed", bill_id=bill_id, error=extracted["error"], message=extracted["message"])
+                        continue
+                    bill_id = exec_one(
+                        conn,
+                        """INSERT INTO bills (user_id, filename, s3_key, s3_url, content_hash, status)
+                           VALUES (?, ?, ?, ?, ?, 'processing')""",
+                        (user_id, result["filename"], str(local_path), public_url, content_hash),
+                    )
+                    ocr_text, structured = extracted
+                    # Each bill gets its own copy; save_bill_result serializes it.
+                    summary = save_bill_result(conn, bill_id, user_id, ocr_text, dict(structured))
+                    result.update(status="done", bill_id=bill_id, s3_url=public_url, **summary)
+        except Exception as e:
+            import traceback
+            print("[ledgerly] batch_upload_failed:", e)
+            traceback.print_exc()
+            return jsonify({"error": "upload_failed", "message": str(e)}), 500
+
+        counts = {status: sum(1 for r in results if r["status"] == status) for status in ("done", "failed", "skipped")}
+        return jsonify({"ok": True, "results": results, "counts": counts})
+
+    @app.get("/api/bills/<int:bill_id>/wait")
+    def api_wait_bill(bill_id: int):
+        """Long-poll until the bill finishes processing (or ``?timeout=`` seconds pass)."""
+        user_id = require_login()
+        if not user_id:
+            return jsonify({"error": "unauthorized"}), 401
+
+        row = wait_for_bill(bill_id, user_id, parse_wait_timeout())
+        if row is None:
+            return jsonify({"error": "not_found"}), 404
+
+        return jsonify({"ok": True, "bill": serialize_bill(row)})
+
+    @app.get("/api/bills/<int:bill_id>/events")
+    def api_bill_events(bill_id: int):
+        """Server-sent events stream that emits the bill once it leaves 'processing'."""
+        user_id = require_login()
+        if not user_id:
+            return jsonify({"error": "unauthorized"}), 401
+
+        if fetch_bill(bill_id, user_id) is None:
+            return jsonify({"error": "not_found"}), 404
+
+        def stream():
+            deadline = time.monotonic() + BILL_EVENTS_TIMEOUT
+            while True:
+                row = wait_for_bill(bill_id, user_id, BILL_EVENTS_KEEPALIVE)
+                if row is None:
+                    return
+                if row["status"] != "processing":
+                    yield f"event: {row['status']}\ndata: {json.dumps(serialize_bill(row))}\n\n"
+                    return
+                if time.monotonic() >= deadline:
+                    yield "event: timeout\ndata: {}\n\n"
+                    return
+                yield ": keep-alive\n\n"
+
+        return Response(
+            stream_with_context(stream()),
+            mimetype="text/event-stream",
+            headers={"X-Accel-Buffering": "no"},
+        )
+
     @app.get("/api/bills")
     def api_list_bills():
-        """List all bills for the current user."""
+        """List the current user's bills newest-first (lightweight projection).
+
+        Keyset-paginated with ``limit`` and ``before_id``; OCR text and items are
+        only returned by ``GET /api/bills/<id>``.
+        """
         user_id = require_login()
         if not user_id:
             return jsonify({"error": "unauthorized"}), 401
 
+        try:
+            limit = int(request.args.get("limit", BILLS_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"error": "limit_invalid"}), 400
+        limit = max(1, min(limit, BILLS_MAX_PAGE_SIZE))
+
+        before_id = request.args.get("before_id")
+        try:
+            before_id = int(before_id) if before_id is not None else None
+        except ValueError:
+            return jsonify({"error": "before_id_invalid"}), 400
+
         with get_conn() as conn:
-            rows = query_all(
-                conn,
-                """SELECT id, filename, s3_url, ocr_text, detected_amount, vendor_name, bill_date,
-                          total_amount, gst_amount, items_json, status, created_at
-                   FROM bills WHERE user_id = ? ORDER BY id DESC""",
-                (user_id,),
-            )
+            if before_id is None:
+                rows = query_all(
+                    conn,
+                    f"SELECT {BILL_LIST_COLUMNS} FROM bills WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+                    (user_id, limit + 1),
+                )
+            else:
+                rows = query_all(
+                    conn,
+                    f"SELECT {BILL_LIST_COLUMNS} FROM bills WHERE user_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                    (user_id, before_id, limit + 1),
+                )
 
-        return jsonify({"ok": True, "bills": [dict(r) for r in rows]})
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return jsonify({
+            "ok": True,
+            "bills": [with_image_urls(dict(r)) for r in rows],
+            "has_more": has_more,
+            "next_before_id": int(rows[-1]["id"]) if has_more else None,
+        })
 
     @app.get("/api/bills/<int:bill_id>")
     def api_get_bill(bill_id: int):
-        """Get a specific bill by ID."""
+        """Get a specific bill by ID.
+
+        ``?fields=ocr_text,items`` limits the response to the named fields
+        (``items`` is the decoded ``items_json``); ``id`` and ``status`` are
+        always included.
+        """
         user_id = require_login()
         if not user_id:
             return jsonify({"error": "unauthorized"}), 401
 
-        with get_conn() as conn:
-            row = query_one(
-                conn,
-                """SELECT id, filename, s3_url, ocr_text, detected_amount, vendor_name, bill_date,
-                          total_amount, gst_amount, items_json, status, created_at
-                   FROM bills WHERE id = ? AND user_id = ?""",
-                (bill_id, user_id),
-            )
+        fields_arg = request.args.get("fields")
+        if fields_arg:
+            requested = {f.strip() for f in fields_arg.split(",") if f.strip()}
+            want_items = "items" in requested
+            keep_items_json = "items_json" in requested
+            requested.discard("items")
+            if want_items:
+                requested.add("items_json")
+            unknown = requested - set(BILL_FIELDS)
+            if unknown:
+                return jsonify({"error": "fields_invalid", "message": f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+            selected = [f for f in BILL_FIELDS if f in requested or f in {"id", "status"}]
+            row = fetch_bill(bill_id, user_id, ", ".join(selected))
+        else:
+            want_items = False
+            keep_items_json = True
+            row = fetch_bill(bill_id, user_id)
 
         if row is None:
             return jsonify({"error": "not_found"}), 404
 
-        return jsonify({"ok": True, "bill": dict(row)})
+        bill = with_image_urls(dict(row))
+        if want_items:
+            raw_items = bill["items_json"] if keep_items_json else bill.pop("items_json")
+            bill["items"] = json.loads(raw_items) if raw_items else []
+
+        return jsonify({"ok": True, "bill": bill})
 
     return app
 
@@ -0,0 +1,152 @@
+"""Micro-benchmark for the regex fallback extractors in extraction.py.
+
+Corpus: ``bills.ocr_text`` from the app database plus any ``*.txt`` OCR dumps
+under the given directories. Each document is run through the old
+per-pattern loops (kept here as the baseline) and the single-scan engine.
+Voice transcripts keep the per-pattern loop (precompiled); the voice samples
+check that its results still match the baseline exactly.
+
+    python bench_extraction.py [--db ledgerly.db] [--rounds 200] [dump_dir ...]
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import sqlite3
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from db import default_db_path
+from extraction import classify_entry_type, detect_voice_amount, extract_ocr_fields, scan_ocr_text
+
+VOICE_SAMPLES = [
+    "5 kilo chawal 500 rupaye mein becha",
+    "200 rupees ka rice kharida",
+    "received 1000 from customer",
+    "paid rs 1,250.50 for diesel",
+    "3 packet doodh 60 ka liya",
+    "customer se 2500 mila",
+    # Keyword inflections only a substring match catches.
+    "300 rupaye ka saaman bechkar aaya",
+    "bechte waqt 450 cash",
+    "payment received 1,800",
+]
+
+
+def legacy_ocr(text: str) -> dict:
+    amount = None
+    for pattern in [
+        r"(?:₹|Rs\.?|INR)\s*([\d,]+\.?\d*)",
+        r"Total[:\s]*([\d,]+\.?\d*)",
+        r"Amount[:\s]*([\d,]+\.?\d*)",
+        r"Grand\s*Total[:\s]*([\d,]+\.?\d*)",
+        r"\b([\d,]+\.\d{2})\b",
+    ]:
+        m = re.search(pattern, text, re.IGNORECASE)
+        if m:
+            try:
+                amount = float(m.group(1).replace(",", ""))
+                break
+            except ValueError:
+                continue
+    bill_date = None
+    for pattern in [r"(\d{1,2}[\-/]\d{1,2}[\-/]\d{2,4})", r"(\d{4}[\-/]\d{1,2}[\-/]\d{1,2})"]:
+        m = re.search(pattern, text)
+        if m:
+            bill_date = m.group(1)
+            break
+    vendor = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not any(label in line.lower() for label in ["invoice", "bill", "date", "gst", "total", "amount"]):
+            vendor = line
+            break
+    return {"amount": amount, "bill_date": bill_date, "vendor_name": vendor}
+
+
+def legacy_voice(text: str) -> tuple[float, str]:
+    lower = text.lower()
+    amount = 0
+    for pattern in [
+        r"(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:rupaye|rupees|rupiya|rs\.?|₹)",
+        r"(?:rupaye|rupees|rupiya|rs\.?|₹)\s*(\d+(?:,\d+)*(?:\.\d+)?)",
+        r"(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:ka|ke|ki|mein|me|में)",
+    ]:
+        m = re.search(pattern, lower)
+        if m:
+            amount = float(m.group(1).replace(",", ""))
+            break
+    if amount == 0:
+        numbers = re.findall(r"(\d+(?:,\d+)*(?:\.\d+)?)", text)
+        if numbers:
+            amount = max(float(n.replace(",", "")) for n in numbers)
+    keywords = ["sold", "received", "income", "becha", "bech", "diya", "milaa", "mila", "aaya", "aayi", "payment received"]
+    entry_type = "income" if any(k in lower for k in keywords) else "expense"
+    return amount, entry_type
+
+
+def new_ocr(text: str) -> dict:
+    scan_ocr_text.cache_clear()  # measure the scan, not the cache
+    return extract_ocr_fields(text)
+
+
+def new_voice(text: str) -> tuple[float, str]:
+    return detect_voice_amount(text), classify_entry_type(text)
+
+
+def load_corpus(db_path: str, dirs: list[str]) -> list[str]:
+    docs = []
+    if Path(db_path).exists():
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            docs += [r[0] for r in conn.execute("SELECT ocr_text FROM bills WHERE ocr_text IS NOT NULL AND ocr_text != ''")]
+        except sqlite3.Error as e:
+            print(f"skipping database corpus: {e}", file=sys.stderr)
+        finally:
+            conn.close()
+    for d in dirs:
+        docs += [p.read_text(encoding="utf-8", errors="replace") for p in sorted(Path(d).glob("**/*.txt"))]
+    return docs
+
+
+def bench(fn, docs: list[str], rounds: int) -> list[float]:
+    """Per-document microseconds for each round."""
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for doc in docs:
+            fn(doc)
+        samples.append((time.perf_counter() - t0) / len(docs) * 1e6)
+    return samples
+
+
+def report(name: str, old: list[float], new: list[float]) -> None:
+    o, n = statistics.median(old), statistics.median(new)
+    print(f"{name:6} legacy {o:9.1f} us/doc   current {n:9.1f} us/doc   speedup {o / n:5.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dirs", nargs="*", help="directories of *.txt OCR dumps")
+    parser.add_argument("--db", default=str(default_db_path()))
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    docs = load_corpus(args.db, args.dirs)
+    if not docs:
+        sys.exit("no OCR text found; pass a directory of *.txt dumps")
+    print(f"corpus: {len(docs)} OCR documents, {sum(map(len, docs))} chars; {len(VOICE_SAMPLES)} voice samples")
+
+    changed = sum(1 for d in docs if {k: v for k, v in new_ocr(d).items() if k != "vendor_gstin"} != legacy_ocr(d))
+    print(f"ocr results differing from legacy: {changed}/{len(docs)}")
+    changed = sum(1 for t in VOICE_SAMPLES if new_voice(t) != legacy_voice(t))
+    print(f"voice results differing from legacy: {changed}/{len(VOICE_SAMPLES)}")
+
+    report("ocr", bench(legacy_ocr, docs, args.rounds), bench(new_ocr, docs, args.rounds))
+    report("voice", bench(legacy_voice, VOICE_SAMPLES, args.rounds * 10), bench(new_voice, VOICE_SAMPLES, args.rounds * 10))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Login lookup cost on a large users table: lower() scan vs normalized-column lookups.
+
+Builds a scratch database with ``--users`` accounts through ``init_db`` (so
+the ``email_norm`` / ``username_norm`` indexes are in place), then times the
+old ``lower(email) = lower(?) OR lower(username) = lower(?)`` query against
+the two point lookups ``api_login`` now does, for email and username logins.
+Password hashing is left out; only the user lookup is measured.
+
+    python bench_login.py [--users 100000] [--lookups 2000]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from db import connect, init_db, normalize_identifier
+
+LEGACY_SQL = """
+    SELECT id, username, email, password_hash
+    FROM users
+    WHERE lower(email) = lower(?) OR lower(username) = lower(?)
+    LIMIT 1
+"""
+EMAIL_SQL = "SELECT id, username, email, password_hash FROM users WHERE email_norm = ?"
+USERNAME_SQL = "SELECT id, username, email, password_hash FROM users WHERE username_norm = ? ORDER BY id LIMIT 1"
+
+
+def legacy_lookup(conn, identifier: str):
+    identifier = identifier.strip()
+    return conn.execute(LEGACY_SQL, (identifier, identifier)).fetchone()
+
+
+def indexed_lookup(conn, identifier: str):
+    key = normalize_identifier(identifier)
+    row = conn.execute(EMAIL_SQL, (key,)).fetchone() if "@" in key else None
+    return row or conn.execute(USERNAME_SQL, (key,)).fetchone()
+
+
+def populate(db_path: Path, users: int) -> None:
+    init_db(db_path)
+    with connect(db_path) as conn:
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO users (username, email, password_hash, username_norm, email_norm) VALUES (?,?,?,?,?)",
+            (
+                (f"Shop Owner {i}", f"owner{i}@example.in", "x", f"shop owner {i}", f"owner{i}@example.in")
+                for i in range(users)
+            ),
+        )
+        conn.execute("COMMIT")
+
+
+def time_lookups(conn, fn, identifiers: list[str]) -> list[float]:
+    samples = []
+    for ident in identifiers:
+        t0 = time.perf_counter()
+        row = fn(conn, ident)
+        samples.append(time.perf_counter() - t0)
+        if row is None:
+            raise SystemExit(f"lookup for {ident!r} found nothing")
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=2000, help="indexed lookups per case (legacy runs a tenth)")
+    args = parser.parse_args()
+
+    db_path = Path(tempfile.mkdtemp(prefix="ledgerly-bench-")) / "login.db"
+    t0 = time.perf_counter()
+    populate(db_path, args.users)
+    print(f"{args.users} users in {time.perf_counter() - t0:.1f}s ({db_path})")
+
+    rng = random.Random(7)
+    ids = [rng.randrange(args.users) for _ in range(args.lookups)]
+    cases = {
+        "email": [f"Owner{i}@Example.in " for i in ids],
+        "username": [f"shop OWNER {i}" for i in ids],
+    }
+    with connect(db_path) as conn:
+        for name, sql, params in (("legacy", LEGACY_SQL, ("a", "a")), ("email", EMAIL_SQL, ("a",)),
+                                  ("username", USERNAME_SQL, ("a",))):
+            plan = " | ".join(r[-1] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+            print(f"  plan {name:8} {plan}")
+        for case, identifiers in cases.items():
+            legacy = time_lookups(conn, legacy_lookup, identifiers[: max(1, len(identifiers) // 10)])
+            indexed = time_lookups(conn, indexed_lookup, identifiers)
+            old, new = statistics.median(legacy), statistics.median(indexed)
+            print(f"  {case:8} lower() scan p50 {old * 1000:8.3f} ms   indexed p50 {new * 1000:6.3f} ms   "
+                  f"{old / new:,.0f}x faster")
+
+
+if __name__ == "__main__":
+    main()
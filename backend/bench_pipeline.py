@@ -0,0 +1,238 @@
+"""Benchmark the bill pipeline stage by stage on the sample uploads.
+
+Runs every bill under ``uploads/bills`` (or the given files/directories)
+through decode, preprocessing, PDF rendering, Tesseract, the regex fallback,
+rule-based validation and the Gemini stage, with Gemini replaced by a local
+stand-in so runs are offline and reproducible. Reports p50/p95 latency and
+throughput per stage plus peak RSS, and writes the numbers to JSON; pass an
+earlier result file with ``--baseline`` to flag regressions.
+
+    python bench_pipeline.py [--rounds 5] [--gemini-latency-ms 0] [--out bench_pipeline.json]
+                             [--baseline previous.json] [path ...]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import app as ledgerly
+import google.generativeai as genai
+import ocr
+from llm_backends import GeminiBackend
+import numpy as np
+import pytesseract
+
+SAMPLE_DIR = Path(__file__).resolve().parent.parent / "uploads" / "bills"
+BILL_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".pdf"}
+# A stage counts as regressed when its p50 is this much slower than the baseline.
+REGRESSION_THRESHOLD = 0.10
+
+
+class StubGeminiModel:
+    """In-process stand-in for ``genai.GenerativeModel``: answers from the OCR text after a fixed delay.
+
+    Extraction prompts get the regex fallback's reading of the OCR hints and
+    verification prompts get their JSON back unchanged, so downstream parsing
+    and validation do the same work as with a real response.
+    """
+
+    latency = 0.0
+    calls = 0
+
+    def __init__(self, model_name: str) -> None:
+        self.model_name = model_name
+
+    def generate_content(self, parts, **kwargs):
+        prompt = parts[0] if isinstance(parts, list) else parts
+        StubGeminiModel.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        embedded = prompt.partition("<<<")[2].rpartition(">>>")[0]
+        try:
+            reply = json.loads(embedded)
+        except ValueError:
+            reply = ledgerly.regex_extract_bill(embedded)
+            reply["confidence"] = 0.9
+        return type("StubResponse", (), {"text": "```json\n" + json.dumps(reply) + "\n```"})()
+
+
+def rss_peak_mb() -> float | None:
+    """Peak resident set size of this process in MiB, when the platform exposes it."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / 2**20, 1)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.samples: dict[str, list[float]] = {}
+        self.skipped: dict[str, str] = {}
+
+    def time(self, stage: str, fn, *args):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        self.samples.setdefault(stage, []).append(time.perf_counter() - t0)
+        return result
+
+    def summary(self) -> dict:
+        out = {}
+        for stage, samples in self.samples.items():
+            total = sum(samples)
+            out[stage] = {
+                "n": len(samples),
+                "p50_ms": round(percentile(samples, 0.50) * 1000, 3),
+                "p95_ms": round(percentile(samples, 0.95) * 1000, 3),
+                "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+                "throughput_per_s": round(len(samples) / total, 2) if total else None,
+            }
+        return out
+
+
+def collect_files(paths: list[str]) -> list[Path]:
+    files: list[Path] = []
+    for raw in paths or [str(SAMPLE_DIR)]:
+        p = Path(raw)
+        candidates = sorted(p.iterdir()) if p.is_dir() else [p]
+        files += [f for f in candidates if f.is_file() and f.suffix.lower() in BILL_SUFFIXES]
+    return files
+
+
+def bench_file(rec: Recorder, path: Path) -> None:
+    if path.suffix.lower() == ".pdf":
+        pages = rec.time("pdf_render", lambda: list(ocr.iter_pdf_pages(path)))
+        gray = np.array(pages[0].convert("L"))
+    else:
+        data = path.read_bytes()
+        gray = rec.time("decode", ocr.decode_bill_image, data)
+        if gray is None:
+            rec.skipped[path.name] = "undecodable"
+            return
+    image = rec.time("preprocess", ocr.preprocess_bill_image, gray)
+
+    if "tesseract" not in rec.skipped:
+        try:
+            ocr_text = rec.time("tesseract", pytesseract.image_to_string, image)
+        except pytesseract.TesseractNotFoundError:
+            rec.skipped["tesseract"] = "tesseract binary not found"
+    if "tesseract" in rec.skipped:
+        ocr_text = ""
+
+    fallback = rec.time("fallback_extract", ledgerly.regex_extract_bill, ocr_text)
+    rec.time("validate", ledgerly.validate_bill_data, dict(fallback, confidence=0.9))
+    rec.time("gemini_stub", ledgerly.run_gemini_structured, image, ocr_text)
+    rec.time("structure_bill", ledgerly.structure_bill, image, ocr_text)
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline_path: str) -> list[str]:
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))["stages"]
+    lines = []
+    for stage, stats in current.items():
+        old = baseline.get(stage)
+        if not old or not old.get("p50_ms"):
+            continue
+        change = stats["p50_ms"] / old["p50_ms"] - 1
+        flag = "  REGRESSION" if change > REGRESSION_THRESHOLD else ""
+        lines.append(f"  {stage:16} p50 {old['p50_ms']:9.2f} -> {stats['p50_ms']:9.2f} ms ({change:+.1%}){flag}")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help=f"bill files or directories (default: {SAMPLE_DIR})")
+    parser.add_argument("--rounds", type=int, default=5, help="passes over the corpus after one warm-up pass")
+    parser.add_argument("--gemini-latency-ms", type=float, default=0.0, help="simulated Gemini round trip")
+    parser.add_argument("--out", default="bench_pipeline.json")
+    parser.add_argument("--baseline", help="earlier --out file to compare against")
+    args = parser.parse_args()
+
+    files = collect_files(args.paths)
+    if not files:
+        sys.exit("no bill files found")
+
+    ledgerly.LLM_BACKEND = GeminiBackend("bench-stub", retries=0)
+    genai.GenerativeModel = StubGeminiModel
+    StubGeminiModel.latency = args.gemini_latency_ms / 1000
+
+    for path in files:  # warm-up: imports, OpenCV/Tesseract init, page cache
+        bench_file(Recorder(), path)
+
+    rec = Recorder()
+    rss_before = rss_peak_mb()
+    t0 = time.perf_counter()
+    for _ in range(args.rounds):
+        for path in files:
+            bench_file(rec, path)
+    elapsed = time.perf_counter() - t0
+
+    stages = rec.summary()
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "files": len(files),
+            "rounds": args.rounds,
+            "gemini_latency_ms": args.gemini_latency_ms,
+            "pipeline_mode": ledgerly.GEMINI_PIPELINE_MODE,
+            "image_max_dim": ocr.IMAGE_MAX_DIM,
+            "image_deskew": ocr.IMAGE_DESKEW,
+            "pdf_dpi": ocr.PDF_DPI,
+            "cpu_count": os.cpu_count(),
+        },
+        "bills_per_s": round(len(files) * args.rounds / elapsed, 2),
+        "peak_rss_mb": rss_peak_mb(),
+        "peak_rss_mb_before_run": rss_before,
+        "gemini_stub_calls": StubGeminiModel.calls,
+        "skipped": rec.skipped,
+        "stages": stages,
+    }
+    Path(args.out).write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+    print(f"{len(files)} bills x {args.rounds} rounds: {result['bills_per_s']} bills/s, peak RSS {result['peak_rss_mb']} MiB")
+    for stage, s in stages.items():
+        print(f"  {stage:16} p50 {s['p50_ms']:9.2f} ms  p95 {s['p95_ms']:9.2f} ms  {s['throughput_per_s']:9.1f}/s  (n={s['n']})")
+    for what, why in rec.skipped.items():
+        print(f"  skipped {what}: {why}")
+    if args.baseline:
+        print(f"vs {args.baseline}:")
+        print("\n".join(compare(stages, args.baseline)) or "  no comparable stages")
+    print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Startup cost of the backend: ``import app`` under ``python -X importtime``, plus ``create_app()``.
+
+Each round imports the app in a fresh interpreter, so results are cold-cache
+numbers for the Python side (the OS page cache stays warm after the first
+round). Prints the median import and ``create_app`` times and the slowest
+top-level imports. Exits non-zero when a module that should only load with the
+first bill (OpenCV, NumPy, Tesseract, Pillow, pdf2image, the Gemini SDK) is
+imported at startup, or when ``--budget-ms`` is exceeded, so it can run in CI.
+
+    python bench_startup.py [--rounds 5] [--top 10] [--budget-ms 400]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+DEFERRED_MODULES = ("cv2", "numpy", "pytesseract", "PIL", "pdf2image", "google.generativeai")
+
+# Runs in the child: import + create_app timings go to stdout, importtime to stderr.
+CHILD = """
+import time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+app.create_app()
+t2 = time.perf_counter()
+print(f"{(t1 - t0) * 1000:.3f} {(t2 - t1) * 1000:.3f}")
+"""
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """``-X importtime`` output -> {module: (cumulative us, nesting depth)}; app itself is depth 0."""
+    modules: dict[str, tuple[int, int]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # importtime indents nested imports by two spaces per level after one separator space.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.setdefault(name.strip(), (int(cumulative_us), depth))
+    return modules
+
+
+def run_once(db_path: Path) -> tuple[float, float, dict[str, tuple[int, int]]]:
+    env = dict(os.environ, LEDGERLY_DB_PATH=str(db_path), LEDGERLY_WARMUP="0")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        cwd=Path(__file__).resolve().parent, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"import app failed:\n{proc.stderr[-2000:]}")
+    import_ms, create_ms = map(float, proc.stdout.strip().splitlines()[-1].split())
+    return import_ms, create_ms, parse_importtime(proc.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    parser.add_argument("--budget-ms", type=float, help="fail when the median import app time is above this")
+    args = parser.parse_args()
+
+    db_path = Path(tempfile.mkdtemp(prefix="ledgerly-bench-")) / "startup.db"
+    runs = [run_once(db_path) for _ in range(max(1, args.rounds))]
+    import_ms = statistics.median(r[0] for r in runs)
+    create_ms = statistics.median(r[1] for r in runs)
+    modules = runs[-1][2]
+
+    print(f"import app   p50 {import_ms:8.1f} ms  ({args.rounds} rounds)")
+    print(f"create_app() p50 {create_ms:8.1f} ms")
+    # Direct imports of app (depth 1) show where the startup time goes.
+    direct = sorted(((us, name) for name, (us, depth) in modules.items() if depth == 1), reverse=True)
+    print("slowest imports of app (cumulative):")
+    for cumulative, name in direct[: args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failures = [f"{name} imported at startup" for name in DEFERRED_MODULES if name in modules]
+    if args.budget_ms is not None and import_ms > args.budget_ms:
+        failures.append(f"import app took {import_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
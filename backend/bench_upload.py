@@ -0,0 +1,100 @@
+"""Throughput of the full upload path: POST /api/bills/upload until the bill is done.
+
+Runs the app in-process on a scratch database and uploads the sample bills
+from ``--clients`` threads, each bill made unique so the extraction cache
+does not short-circuit OCR and the LLM. The LLM response cache is turned off
+too: it keys on the decoded pixels and OCR text, which the extra bytes don't
+change. Point it at the local stub to measure without network:
+
+    python llm_stub_server.py --latency-ms 800 &
+    LEDGERLY_LLM_BACKEND=stub python bench_upload.py [--bills 100] [--clients 8] [path ...]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+SAMPLE_DIR = Path(__file__).resolve().parent.parent / "uploads" / "bills"
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".pdf"}
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help=f"bill files (default: {SAMPLE_DIR})")
+    parser.add_argument("--bills", type=int, default=50, help="total uploads")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent uploaders")
+    args = parser.parse_args()
+
+    files = [Path(p) for p in args.paths] or sorted(
+        p for p in SAMPLE_DIR.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES
+    )
+    if not files:
+        sys.exit("no bill files found")
+    payloads = [(f.name, f.read_bytes()) for f in files]
+
+    scratch = Path(tempfile.mkdtemp(prefix="ledgerly-bench-"))
+    os.environ["LEDGERLY_DB_PATH"] = str(scratch / "bench.db")
+    # Every upload should pay the LLM latency, not hit the response cache.
+    os.environ["LEDGERLY_LLM_CACHE"] = "0"
+    import app as ledgerly
+
+    ledgerly.BILLS_UPLOAD_DIR = scratch / "bills"
+    flask_app = ledgerly.create_app()
+    print(f"backend={ledgerly.LLM_BACKEND.name} llm_cache=off bills={args.bills} clients={args.clients} scratch={scratch}")
+
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    lock = threading.Lock()
+    counter = iter(range(args.bills))
+
+    def worker() -> None:
+        client = flask_app.test_client()
+        client.post("/api/login", json={"identifier": "demo@ledgerly.in", "password": "Ledgerly@123"})
+        for i in counter:
+            name, data = payloads[i % len(payloads)]
+            # Trailing bytes keep the image decodable but give it a new content hash.
+            body = data + b"\n" + uuid.uuid4().hex.encode()
+            started = time.perf_counter()
+            r = client.post("/api/bills/upload", data={"file": (io.BytesIO(body), name)},
+                            content_type="multipart/form-data")
+            status = f"upload_{r.status_code}"
+            if r.status_code == 202:
+                bill_id = r.json["bill"]["id"]
+                while True:
+                    r = client.get(f"/api/bills/{bill_id}/wait?timeout=25")
+                    status = r.json["bill"]["status"]
+                    if status != "processing":
+                        break
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(max(1, args.clients))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+
+    print(f"{len(latencies)} bills in {wall:.1f}s: {len(latencies) / wall:.2f} bills/s  outcomes {statuses}")
+    print(f"upload->done p50 {percentile(latencies, 0.5) * 1000:.0f}ms  p95 {percentile(latencies, 0.95) * 1000:.0f}ms  "
+          f"mean {statistics.fmean(latencies) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,43 @@
 from __future__ import annotations
 
 import os
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Callable, Iterable, Iterator
+
+from gst import normalize_bill_date
+from rollups import add_to_rollups
 
 
 @dataclass(frozen=True)
 class DbConfig:
     db_path: Path
+    pool_size: int = 8
+    # Seconds to wait for a free pooled connection before giving up.
+    pool_timeout: float = 30.0
+    # Per-connection prepared statement cache (sqlite3 ``cached_statements``).
+    cached_statements: int = 256
+    # Negative cache_size is in KiB (here ~16 MB page cache per connection).
+    cache_size_kib: int = 16384
+    mmap_size: int = 128 * 1024 * 1024
+    # Pages written to the WAL before an automatic checkpoint (SQLite default is 1000).
+    wal_autocheckpoint: int = 1000
+
+    @classmethod
+    def from_env(cls, db_path: Path) -> "DbConfig":
+        return cls(
+            db_path=db_path,
+            pool_size=int(os.environ.get("LEDGERLY_DB_POOL_SIZE", cls.pool_size)),
+            pool_timeout=float(os.environ.get("LEDGERLY_DB_POOL_TIMEOUT", cls.pool_timeout)),
+            cache_size_kib=int(os.environ.get("LEDGERLY_DB_CACHE_KIB", cls.cache_size_kib)),
+            mmap_size=int(os.environ.get("LEDGERLY_DB_MMAP_SIZE", cls.mmap_size)),
+            wal_autocheckpoint=int(os.environ.get("LEDGERLY_DB_WAL_AUTOCHECKPOINT", cls.wal_autocheckpoint)),
+        )
 
 
 def default_db_path() -> Path:
@@ -29,6 +57,139 @@ def connect(db_path: Path) -> sqlite3.Connection:
     return conn
 
 
+class ConnectionPool:
+    """Bounded pool of long-lived SQLite connections.
+
+    PRAGMAs run once when a connection is opened instead of on every request.
+    Connections are handed to one thread at a time, so ``check_same_thread``
+    is disabled; a connection that fails its health check is replaced.
+    ``on_acquire`` is called with the seconds each checkout took.
+    """
+
+    def __init__(self, config: DbConfig, on_acquire: Callable[[float], None] | None = None) -> None:
+        self.config = config
+        self._on_acquire = on_acquire
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max(1, config.pool_size))
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+
+    def _open(self) -> sqlite3.Connection:
+        cfg = self.config
+        conn = sqlite3.connect(
+            cfg.db_path,
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=cfg.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA busy_timeout = 30000")
+        conn.execute(f"PRAGMA cache_size = {-int(cfg.cache_size_kib)}")
+        conn.execute(f"PRAGMA mmap_size = {int(cfg.mmap_size)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute(f"PRAGMA wal_autocheckpoint = {int(cfg.wal_autocheckpoint)}")
+        with self._lock:
+            self._opened += 1
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._opened -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self) -> sqlite3.Connection:
+        started = time.perf_counter()
+        conn = self._checkout()
+        if self._on_acquire is not None:
+            self._on_acquire(time.perf_counter() - started)
+        return conn
+
+    def _checkout(self) -> sqlite3.Connection:
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        if not self._slots.acquire(timeout=self.config.pool_timeout):
+            raise TimeoutError("Timed out waiting for a database connection")
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._open()
+                if self._is_healthy(conn):
+                    return conn
+                self._discard(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            if self._closed:
+                self._discard(conn)
+            else:
+                self._idle.put(conn)
+        except sqlite3.Error:
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Check out a connection; commits on success, rolls back on error."""
+        conn = self.acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            opened = self._opened
+        return {"size": self.config.pool_size, "open": opened, "idle": self._idle.qsize()}
+
+    def health_check(self) -> dict[str, Any]:
+        ok = True
+        try:
+            with self.connection() as conn:
+                ok = self._is_healthy(conn)
+        except (sqlite3.Error, TimeoutError, RuntimeError):
+            ok = False
+        return {"ok": ok, **self.stats()}
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+def normalize_identifier(value: str) -> str:
+    """Canonical form of an email or username for ``email_norm`` / ``username_norm`` lookups."""
+    return value.strip().lower()
+
+
 def init_db(db_path: Path) -> None:
     db_path.parent.mkdir(parents=True, exist_ok=True)
     with connect(db_path) as conn:
@@ -63,6 +224,7 @@ def init_db(db_path: Path) -> None:
             );
 
             CREATE INDEX IF NOT EXISTS idx_entries_user_id ON entries(user_id);
+            CREATE INDEX IF NOT EXISTS idx_entries_user_type_id ON entries(user_id, entry_type, id);
 
             CREATE TABLE IF NOT EXISTS bills (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -105,6 +267,43 @@ def init_db(db_path: Path) -> None:
             );
 
             CREATE INDEX IF NOT EXISTS idx_business_profiles_user_id ON business_profiles(user_id);
+
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used_at);
+
+            -- Incrementally maintained income/expense/GST totals per user and
+            -- bucket; grain is 'day' (YYYY-MM-DD), 'month' (YYYY-MM) or 'vendor'.
+            CREATE TABLE IF NOT EXISTS entry_rollups (
+                user_id INTEGER NOT NULL,
+                grain TEXT NOT NULL CHECK(grain IN ('day','month','vendor')),
+                bucket TEXT NOT NULL,
+                income REAL NOT NULL DEFAULT 0,
+                expense REAL NOT NULL DEFAULT 0,
+                gst REAL NOT NULL DEFAULT 0,
+                entry_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, grain, bucket),
+                FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+            ) WITHOUT ROWID;
+
+            -- GST summaries for finished periods (YYYY-MM); rows are dropped
+            -- when an entry with a bill_date in that period is written.
+            CREATE TABLE IF NOT EXISTS gst_summary_cache (
+                user_id INTEGER NOT NULL,
+                period TEXT NOT NULL,
+                summary_json TEXT NOT NULL,
+                computed_at TEXT NOT NULL DEFAULT (datetime('now')),
+                PRIMARY KEY (user_id, period),
+                FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+            ) WITHOUT ROWID;
             """
         )
 
@@ -119,6 +318,17 @@ def init_db(db_path: Path) -> None:
         add_column_if_missing("bills", "total_amount", "REAL")
         add_column_if_missing("bills", "gst_amount", "REAL")
         add_column_if_missing("bills", "items_json", "TEXT")
+        add_column_if_missing("bills", "confidence", "REAL")
+        add_column_if_missing("bills", "error", "TEXT")
+        add_column_if_missing("bills", "error_message", "TEXT")
+        add_column_if_missing("bills", "content_hash", "TEXT")
+        add_column_if_missing("bills", "extraction_json", "TEXT")
+        add_column_if_missing("bills", "extraction_version", "TEXT")
+        add_column_if_missing("bills", "requeue_count", "INTEGER NOT NULL DEFAULT 0")
+        # Lease on a 'processing' bill, renewed by the process running its job.
+        add_column_if_missing("bills", "lease_owner", "TEXT")
+        add_column_if_missing("bills", "lease_expires_at", "TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_bills_content_hash ON bills(content_hash)")
 
         # Entries table migrations (for GST ledger)
         add_column_if_missing("entries", "vendor_name", "TEXT")
@@ -130,6 +340,48 @@ def init_db(db_path: Path) -> None:
         add_column_if_missing("entries", "sgst_amount", "REAL")
         add_column_if_missing("entries", "igst_amount", "REAL")
 
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_user_bill_date ON entries(user_id, bill_date)")
+
+        # Case-insensitive login lookups: lower(email) in a WHERE clause can't use
+        # an index, so keep normalized copies of both identifiers and index those.
+        add_column_if_missing("users", "email_norm", "TEXT")
+        add_column_if_missing("users", "username_norm", "TEXT")
+        rows = conn.execute(
+            "SELECT id, email, username FROM users WHERE email_norm IS NULL OR username_norm IS NULL"
+        ).fetchall()
+        if rows:
+            conn.executemany(
+                "UPDATE users SET email_norm = ?, username_norm = ? WHERE id = ?",
+                [(normalize_identifier(r["email"]), normalize_identifier(r["username"]), r["id"]) for r in rows],
+            )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_users_email_norm ON users(email_norm)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_users_username_norm ON users(username_norm)")
+
+        # Normalize free-form bill dates to ISO so GST period scans can use the index.
+        for table in ("entries", "bills"):
+            rows = conn.execute(
+                f"""SELECT id, bill_date FROM {table}
+                    WHERE bill_date IS NOT NULL AND bill_date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"""
+            ).fetchall()
+            updates = []
+            for row in rows:
+                normalized = normalize_bill_date(row["bill_date"])
+                if normalized != row["bill_date"]:
+                    updates.append((normalized, row["id"]))
+            if updates:
+                conn.executemany(f"UPDATE {table} SET bill_date = ? WHERE id = ?", updates)
+
+        # Seed rollups from existing entries while none exist yet. The check runs
+        # under the write lock, so concurrent starts seed once, and a start that
+        # crashed before committing leaves the table empty for the next one.
+        conn.execute("BEGIN IMMEDIATE")
+        needs_seed = conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM entries) AND NOT EXISTS (SELECT 1 FROM entry_rollups)"
+        ).fetchone()[0]
+        if needs_seed:
+            add_to_rollups(conn, "1")
+        conn.execute("COMMIT")
+
 
 def query_one(conn: sqlite3.Connection, sql: str, params: Iterable[Any] = ()) -> sqlite3.Row | None:
     cur = conn.execute(sql, tuple(params))
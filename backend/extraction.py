@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+# Regex extraction used when Gemini is unavailable (OCR bills) or returns
+# nothing usable (voice transcripts). Every pattern is compiled once. OCR text
+# is scanned a single time and callers pick from the positioned candidates;
+# transcripts are a sentence long, so voice keeps its per-pattern priority loop.
+
+_NUMBER = r"\d+(?:,\d+)*(?:\.\d+)?"
+_LOOSE_NUMBER = r"[\d,]+\.?\d*"
+
+# Amount alternatives in priority order (lower rank wins, then earliest).
+# "Grand Total" shares the "Total" rank: the old per-pattern loop matched
+# plain "Total" inside it anyway.
+AMOUNT_RANKS = {"currency": 0, "total": 1, "grand_total": 1, "amount": 2, "decimal": 3}
+
+# The leading lookahead lets the engine skip positions that cannot start any
+# alternative (most of the text) instead of trying every branch there.
+_OCR_SCAN = re.compile(
+    r"(?=[\d₹rRiIgGtTaA])(?:"
+    r"(?<!\d)(?:(?P<gstin>\d{2}[A-Z]{5}\d{4}[A-Z][1-9A-Z]Z[0-9A-Z]\b)"
+    r"|(?P<date_ymd>\d{4}[-/]\d{1,2}[-/]\d{1,2})(?!\d)"
+    r"|(?P<date_dmy>\d{1,2}[-/]\d{1,2}[-/]\d{2,4})(?!\d))"
+    rf"|(?:₹|Rs\.?|INR)\s*(?P<currency>{_LOOSE_NUMBER})"
+    rf"|Grand\s*Total[:\s]*(?P<grand_total>{_LOOSE_NUMBER})"
+    rf"|Total[:\s]*(?P<total>{_LOOSE_NUMBER})"
+    rf"|Amount[:\s]*(?P<amount>{_LOOSE_NUMBER})"
+    r"|\b(?P<decimal>[\d,]+\.\d{2})\b)",
+    re.IGNORECASE,
+)
+# GSTINs are upper case; the scan is case-insensitive for the amount labels.
+_GSTIN_STRICT = re.compile(r"\d{2}[A-Z]{5}\d{4}[A-Z][1-9A-Z]Z[0-9A-Z]")
+
+_VENDOR_LINE = re.compile(r"^[ \t]*(\S[^\n]*?)[ \t\r]*$", re.MULTILINE)
+_VENDOR_SKIP = re.compile(r"invoice|bill|date|gst|total|amount", re.IGNORECASE)
+
+_CURRENCY_WORDS = r"rupaye|rupees|rupiya|rs\.?|₹"
+# Tried in order; the first pattern that matches anywhere gives the amount.
+_VOICE_AMOUNT_PATTERNS = tuple(
+    re.compile(pattern)
+    for pattern in (
+        rf"({_NUMBER})\s*(?:{_CURRENCY_WORDS})",  # 500 rupaye
+        rf"(?:{_CURRENCY_WORDS})\s*({_NUMBER})",  # rs 500
+        rf"({_NUMBER})\s*(?:ka|ke|ki|mein|me|में)",  # 500 ka (Hindi postposition)
+    )
+)
+_VOICE_NUMBER = re.compile(_NUMBER)
+# Substrings, so inflections like "bechkar" / "bechte" count too.
+INCOME_KEYWORDS = (
+    "sold", "received", "income", "becha", "bech", "diya", "milaa", "mila", "aaya", "aayi", "payment received",
+)
+
+
+class Candidate(NamedTuple):
+    kind: str
+    text: str
+    start: int
+    end: int
+
+
+def _to_float(text: str) -> float | None:
+    try:
+        return float(text.replace(",", ""))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=32)
+def scan_ocr_text(text: str) -> tuple[Candidate, ...]:
+    """All amount/date/GSTIN candidates in ``text``, in order of position.
+
+    Cached so the fallback extractor and the bill save path share one scan.
+    """
+    out = []
+    for m in _OCR_SCAN.finditer(text):
+        kind = m.lastgroup
+        if kind == "gstin" and not _GSTIN_STRICT.fullmatch(m.group(kind)):
+            continue
+        out.append(Candidate(kind, m.group(kind), m.start(kind), m.end(kind)))
+    return tuple(out)
+
+
+def detect_amount(text: str) -> float | None:
+    """Best currency/total amount in OCR text, or None."""
+    best = None
+    for c in scan_ocr_text(text):
+        rank = AMOUNT_RANKS.get(c.kind)
+        if rank is None or (best is not None and rank >= best[0]):
+            continue
+        value = _to_float(c.text)
+        if value is not None:
+            best = (rank, value)
+    return best[1] if best else None
+
+
+def detect_vendor(text: str) -> str | None:
+    """First non-empty line that isn't obviously a label."""
+    for m in _VENDOR_LINE.finditer(text):
+        line = m.group(1)
+        if not _VENDOR_SKIP.search(line):
+            return line
+    return None
+
+
+def extract_ocr_fields(text: str) -> dict:
+    """Amount, bill date, vendor and GSTIN from raw OCR text."""
+    candidates = scan_ocr_text(text)
+    bill_date = next((c.text for c in candidates if c.kind in ("date_ymd", "date_dmy")), None)
+    gstin = next((c.text for c in candidates if c.kind == "gstin"), None)
+    return {
+        "amount": detect_amount(text),
+        "bill_date": bill_date,
+        "vendor_name": detect_vendor(text),
+        "vendor_gstin": gstin,
+    }
+
+
+def detect_voice_amount(text: str) -> float:
+    """Amount next to a currency word/postposition, else the largest number, else 0."""
+    lower = text.lower()
+    amount = 0.0
+    for pattern in _VOICE_AMOUNT_PATTERNS:
+        m = pattern.search(lower)
+        if m:
+            value = _to_float(m.group(1))
+            if value is not None:
+                amount = value
+                break
+    if amount == 0:
+        numbers = [v for v in map(_to_float, _VOICE_NUMBER.findall(text)) if v is not None]
+        if numbers:
+            amount = max(numbers)
+    return amount
+
+
+def classify_entry_type(text: str) -> str:
+    """'income' when the text contains a selling/receiving keyword, else 'expense'."""
+    lower = text.lower()
+    return "income" if any(keyword in lower for keyword in INCOME_KEYWORDS) else "expense"
+
+
+def regex_extract_bill(ocr_text: str) -> dict:
+    """Bill dict in the LLM extraction schema, read from OCR text with regexes."""
+    fields = extract_ocr_fields(ocr_text)
+    detected_amount = fields["amount"]
+    return {
+        "vendor_name": fields["vendor_name"],
+        "vendor_gstin": fields["vendor_gstin"],
+        "bill_number": None,
+        "bill_date": fields["bill_date"],
+        "items": [],
+        "subtotal": None,
+        "cgst_rate": None,
+        "cgst_amount": None,
+        "sgst_rate": None,
+        "sgst_amount": None,
+        "igst_rate": None,
+        "igst_amount": None,
+        "total_amount": detected_amount,
+        "confidence": 0.35 if detected_amount else 0.2,
+    }
+
+
+def regex_extract_voice(transcript: str) -> dict:
+    """Voice entry dict in the LLM extraction schema, read with regexes.
+
+    Handles Hinglish patterns like:
+    - "5 kilo chawal 500 rupaye mein becha" -> amount=500, type=income
+    - "200 rupees ka rice kharida" -> amount=200, type=expense
+    - "received 1000 from customer" -> amount=1000, type=income
+    """
+    amount = detect_voice_amount(transcript)
+    entry_type = classify_entry_type(transcript)
+    return {
+        "entry_type": entry_type,
+        "amount": amount,
+        "note": transcript,
+        "items": [],
+    }
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from typing import Any, Callable
+
+# Bill dates arrive in whatever format the OCR/LLM produced; Indian bills are
+# day-first. Stored dates are normalized to ISO (YYYY-MM-DD) so period queries
+# can range-scan idx_entries_user_bill_date.
+_DATE_FORMATS = (
+    "%d %b %Y", "%d-%b-%Y", "%d %B %Y", "%d-%B-%Y", "%b %d, %Y", "%B %d, %Y",
+)
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_NUMERIC_DATE = re.compile(r"^(\d{1,4})[./-](\d{1,2})[./-](\d{1,4})$")
+_PERIOD = re.compile(r"^(\d{4})-(0[1-9]|1[0-2])$")
+
+
+def normalize_bill_date(value: Any) -> str | None:
+    """Return ``value`` as YYYY-MM-DD when it parses as a date, else the original string."""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    if _ISO_DATE.match(text):
+        return text
+    return _parse_date_text(text)
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_text(text: str) -> str:
+    # Fast path for numeric dates (the bulk of OCR output and imports);
+    # strptime is only tried for month names.
+    m = _NUMERIC_DATE.match(text)
+    if m:
+        a, b, c = m.groups()
+        try:
+            if len(a) == 4:
+                return date(int(a), int(b), int(c)).isoformat()
+            if len(c) in (2, 4):
+                year = int(c) + 2000 if len(c) == 2 else int(c)
+                return date(year, int(b), int(a)).isoformat()
+        except ValueError:
+            pass
+        return text
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return text
+
+
+def parse_period(period: str) -> tuple[str, str] | None:
+    """``YYYY-MM`` -> (first day, first day of next month) as ISO strings."""
+    m = _PERIOD.match(period or "")
+    if not m:
+        return None
+    year, month = int(m.group(1)), int(m.group(2))
+    start = date(year, month, 1)
+    end = date(year + (month == 12), month % 12 + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def invalidate_gst_period(conn: sqlite3.Connection, user_id: int, bill_date: str | None) -> None:
+    """Drop the cached summary for the period an entry's bill_date falls in."""
+    if bill_date and _ISO_DATE.match(bill_date):
+        conn.execute(
+            "DELETE FROM gst_summary_cache WHERE user_id = ? AND period = ?",
+            (user_id, bill_date[:7]),
+        )
+
+
+def _round(value: Any) -> float:
+    return round(float(value or 0), 2)
+
+
+def compute_gst_summary(conn: sqlite3.Connection, user_id: int, period: str) -> dict[str, Any]:
+    """Input tax credit for one period, grouped by supplier GSTIN and tax head.
+
+    Single grouped pass over expense entries whose bill_date falls in the
+    period (range scan on (user_id, bill_date)). Entries without a valid
+    15-character GSTIN are reported separately as ineligible for ITC.
+    """
+    bounds = parse_period(period)
+    if bounds is None:
+        raise ValueError("period must be YYYY-MM")
+    start, end = bounds
+
+    rows = conn.execute(
+        """SELECT COALESCE(vendor_gstin, '') AS gstin,
+                  MAX(vendor_name) AS vendor_name,
+                  COUNT(*) AS bills,
+                  SUM(amount) AS invoice_value,
+                  SUM(COALESCE(taxable_amount, 0)) AS taxable_value,
+                  SUM(COALESCE(cgst_amount, 0)) AS cgst,
+                  SUM(COALESCE(sgst_amount, 0)) AS sgst,
+                  SUM(COALESCE(igst_amount, 0)) AS igst
+           FROM entries
+           WHERE user_id = ? AND bill_date >= ? AND bill_date < ? AND entry_type = 'expense'
+           GROUP BY COALESCE(vendor_gstin, '')""",
+        (user_id, start, end),
+    ).fetchall()
+
+    heads = ("invoice_value", "taxable_value", "cgst", "sgst", "igst")
+    eligible_totals = dict.fromkeys(heads, 0.0)
+    ineligible_totals = dict.fromkeys(heads, 0.0)
+    suppliers = []
+    ineligible_bills = 0
+    for row in rows:
+        gstin = row["gstin"].strip().upper()
+        values = {head: _round(row[head]) for head in heads}
+        if len(gstin) == 15 and gstin.isalnum():
+            suppliers.append({
+                "gstin": gstin,
+                "vendor_name": row["vendor_name"],
+                "bills": int(row["bills"]),
+                **values,
+                "total_itc": _round(values["cgst"] + values["sgst"] + values["igst"]),
+            })
+            for head in heads:
+                eligible_totals[head] += values[head]
+        else:
+            ineligible_bills += int(row["bills"])
+            for head in heads:
+                ineligible_totals[head] += values[head]
+
+    suppliers.sort(key=lambda s: s["total_itc"], reverse=True)
+    eligible = {head: _round(v) for head, v in eligible_totals.items()}
+    eligible["total_itc"] = _round(eligible["cgst"] + eligible["sgst"] + eligible["igst"])
+    eligible["bills"] = sum(s["bills"] for s in suppliers)
+    ineligible = {head: _round(v) for head, v in ineligible_totals.items()}
+    ineligible["bills"] = ineligible_bills
+
+    return {
+        "period": period,
+        "itc": {"suppliers": suppliers, "totals": eligible},
+        "ineligible": ineligible,
+    }
+
+
+def _begin_immediate(conn: sqlite3.Connection) -> None:
+    conn.execute("BEGIN IMMEDIATE")
+
+
+def gst_summary(
+    conn: sqlite3.Connection,
+    user_id: int,
+    period: str,
+    begin_write: Callable[[sqlite3.Connection], None] = _begin_immediate,
+) -> tuple[dict[str, Any], bool]:
+    """Summary for ``period``; finished months are served from gst_summary_cache.
+
+    Returns (summary, cached). The current and future months are always
+    computed live since new bills keep landing in them. On a cache miss the
+    summary is computed and stored inside one write transaction (committed
+    when the caller's pooled connection context exits), so an entry write
+    that invalidates the period can't land in between and be overwritten by
+    a stale summary. ``begin_write`` opens that transaction; the app passes
+    its own so the wait for the write lock is recorded as "db_lock".
+    """
+    current_period = datetime.now(timezone.utc).strftime("%Y-%m")
+    if period >= current_period:
+        return compute_gst_summary(conn, user_id, period), False
+
+    cached = _cached_summary(conn, user_id, period)
+    if cached is not None:
+        return cached, True
+
+    begin_write(conn)
+    # Another request may have filled the cache while we waited for the lock.
+    cached = _cached_summary(conn, user_id, period)
+    if cached is not None:
+        return cached, True
+    summary = compute_gst_summary(conn, user_id, period)
+    conn.execute(
+        """INSERT OR REPLACE INTO gst_summary_cache (user_id, period, summary_json, computed_at)
+           VALUES (?, ?, ?, datetime('now'))""",
+        (user_id, period, json.dumps(summary)),
+    )
+    return summary, False
+
+
+def _cached_summary(conn: sqlite3.Connection, user_id: int, period: str) -> dict[str, Any] | None:
+    row = conn.execute(
+        "SELECT summary_json FROM gst_summary_cache WHERE user_id = ? AND period = ?",
+        (user_id, period),
+    ).fetchone()
+    return json.loads(row["summary_json"]) if row is not None else None
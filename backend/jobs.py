@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import threading
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class BillJobQueue:
+    """Local worker pool that runs bill processing outside the request thread.
+
+    Each submitted bill gets a completion event so long-poll / SSE handlers in
+    the same process can wait without hammering SQLite. Waiters in other
+    processes (or arriving after the job finished) fall back to reading the
+    bill row's status.
+    """
+
+    def __init__(self, handler: Callable[..., None], max_workers: int = 2) -> None:
+        self._handler = handler
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ledgerly-bill")
+        self._events: dict[int, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, bill_id: int, *args: Any) -> Future:
+        event = threading.Event()
+        with self._lock:
+            self._events[bill_id] = event
+        return self._executor.submit(self._run, bill_id, event, args)
+
+    def _run(self, bill_id: int, event: threading.Event, args: tuple) -> None:
+        try:
+            self._handler(bill_id, *args)
+        except Exception as e:
+            print(f"[ledgerly] bill job {bill_id} crashed: {e}")
+            traceback.print_exc()
+        finally:
+            event.set()
+            with self._lock:
+                self._events.pop(bill_id, None)
+
+    def pending_ids(self) -> list[int]:
+        """Bills submitted to this process that have not finished yet."""
+        with self._lock:
+            return list(self._events)
+
+    def wait(self, bill_id: int, timeout: float) -> bool | None:
+        """Block until the bill's job finishes.
+
+        Returns True/False like ``Event.wait`` when the job is tracked by this
+        process, or None when it is not (already finished or owned elsewhere).
+        """
+        with self._lock:
+            event = self._events.get(bill_id)
+        if event is None:
+            return None
+        return event.wait(timeout)
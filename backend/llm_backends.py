@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Mapping
+
+from extraction import regex_extract_bill, regex_extract_voice
+from metrics import metrics
+
+# Tasks the pipeline asks a backend for. ``context`` carries the raw inputs
+# (ocr_text / extracted / transcript) for backends that don't read prompts.
+TASKS = ("bill_extract", "bill_verify", "voice")
+
+metrics.describe("ledgerly_llm_call_seconds", "LLM backend attempts, by backend, task and outcome.")
+
+
+def prompt_digest(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class DeadlineExceededError(TimeoutError):
+    """The call (queueing, attempts and backoff) ran past its deadline."""
+
+
+class CircuitOpenError(RuntimeError):
+    """The backend failed repeatedly; calls are refused until a probe succeeds."""
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failed calls.
+
+    While open every call is refused immediately. After ``reset_after``
+    seconds one probe call is let through (half-open): success closes the
+    breaker, failure re-opens it for another ``reset_after``.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_after: float = 30.0) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_after = reset_after
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_after:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                print("[ledgerly] LLM circuit closed")
+            self.state = "closed"
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state == "closed":
+                    print(f"[ledgerly] LLM circuit open after {self._failures} consecutive failures")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class ExtractionBackend:
+    """Turns a prompt (plus optional bill image) into the raw JSON text of a reply.
+
+    Subclasses implement ``_generate``; ``generate`` wraps it with a
+    concurrency limit, a per-attempt timeout, retries with jittered
+    exponential backoff for errors ``is_retryable`` accepts, a hard
+    ``deadline`` for the whole call and an optional circuit breaker. Attempts
+    run on the backend's own worker threads, so a hung provider call costs
+    the caller at most ``deadline`` seconds. With ``record_path`` set, every
+    reply is appended there as JSON lines that llm_stub_server.py can replay.
+    """
+
+    name = "base"
+    # Whether OCR should keep the preprocessed image for this backend.
+    wants_image = True
+    # Whether a second verification call can improve on the first answer.
+    verifies = True
+    # Cheap local backends run on the caller's thread without limits.
+    inline = False
+
+    def __init__(
+        self,
+        timeout: float = 60.0,
+        retries: int = 2,
+        concurrency: int = 4,
+        backoff: float = 0.5,
+        deadline: float = 90.0,
+        breaker: CircuitBreaker | None = None,
+        record_path: str | None = None,
+    ) -> None:
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.deadline = deadline
+        self.breaker = breaker
+        self.record_path = record_path
+        self._executor = None if self.inline else ThreadPoolExecutor(
+            max_workers=max(1, concurrency), thread_name_prefix=f"ledgerly-llm-{self.name}"
+        )
+        self._record_lock = threading.Lock()
+
+    @property
+    def cache_namespace(self) -> str | None:
+        """Model id used in LLM cache keys; None disables caching for this backend."""
+        return None
+
+    def generate(self, task: str, prompt: str, image=None, context: Mapping[str, Any] | None = None) -> str:
+        context = context or {}
+        if self._executor is None:
+            return self._generate(task, prompt, image, context)
+        if self.breaker is not None and not self.breaker.allow():
+            metrics.observe("ledgerly_llm_call_seconds", 0.0, backend=self.name, task=task, outcome="circuit_open")
+            raise CircuitOpenError(f"{self.name} circuit open")
+        try:
+            text = self._call_with_retries(task, prompt, image, context, time.monotonic() + self.deadline)
+        except Exception:
+            if self.breaker is not None:
+                self.breaker.record_failure()
+            raise
+        if self.breaker is not None:
+            self.breaker.record_success()
+        if self.record_path:
+            self._record(task, prompt, text)
+        return text
+
+    def _call_with_retries(self, task, prompt, image, context, deadline: float) -> str:
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceededError(f"{self.name} {task}: deadline of {self.deadline:.0f}s exceeded")
+            started = time.perf_counter()
+            # Queue wait for a worker counts against the deadline, too.
+            future = self._executor.submit(self._generate, task, prompt, image, context, min(self.timeout, remaining))
+            try:
+                text = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                future.cancel()
+                metrics.observe("ledgerly_llm_call_seconds", time.perf_counter() - started,
+                                backend=self.name, task=task, outcome="deadline")
+                raise DeadlineExceededError(f"{self.name} {task}: deadline of {self.deadline:.0f}s exceeded") from None
+            except Exception as e:
+                retry = attempt < self.retries and self.is_retryable(e)
+                metrics.observe("ledgerly_llm_call_seconds", time.perf_counter() - started,
+                                backend=self.name, task=task, outcome="retry" if retry else "error")
+                if not retry:
+                    raise
+                attempt += 1
+                pause = self.backoff * (2 ** (attempt - 1)) * (0.5 + random.random())
+                time.sleep(max(0.0, min(pause, deadline - time.monotonic())))
+                continue
+            metrics.observe("ledgerly_llm_call_seconds", time.perf_counter() - started,
+                            backend=self.name, task=task, outcome="ok")
+            return text
+
+    def warm_up(self) -> None:
+        """Load the provider SDK / client now instead of on the first call."""
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": self.name,
+            "circuit": self.breaker.state if self.breaker is not None else None,
+        }
+
+    def _generate(self, task: str, prompt: str, image, context: Mapping[str, Any], timeout: float | None = None) -> str:
+        """One provider call; ``timeout`` is what is left of the deadline, capped at ``self.timeout``."""
+        raise NotImplementedError
+
+    def _record(self, task: str, prompt: str, text: str) -> None:
+        line = json.dumps({"task": task, "prompt_sha256": prompt_digest(prompt), "backend": self.name, "text": text})
+        with self._record_lock, open(self.record_path, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+
+    def is_retryable(self, exc: Exception) -> bool:
+        return isinstance(exc, (TimeoutError, ConnectionError))
+
+
+_gemini_models: dict[str, Any] = {}
+_gemini_models_lock = threading.Lock()
+
+
+def gemini_model(model_name: str, api_key: str | None = None):
+    """Shared ``GenerativeModel`` per model name; clients are thread-safe and reusable.
+
+    The SDK is slow to import, so it is loaded (and configured with
+    ``api_key``) on first use rather than at startup.
+    """
+    model = _gemini_models.get(model_name)
+    if model is None:
+        import google.generativeai as genai
+
+        with _gemini_models_lock:
+            model = _gemini_models.get(model_name)
+            if model is None:
+                if api_key:
+                    genai.configure(api_key=api_key)
+                model = _gemini_models[model_name] = genai.GenerativeModel(model_name)
+    return model
+
+
+class GeminiBackend(ExtractionBackend):
+    name = "gemini"
+
+    def __init__(self, model_name: str, api_key: str | None = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.model_name = model_name
+        self.api_key = api_key
+
+    @property
+    def cache_namespace(self) -> str:
+        return self.model_name
+
+    def _generate(self, task, prompt, image, context, timeout=None):
+        response = gemini_model(self.model_name, self.api_key).generate_content(
+            [prompt, image] if image is not None else prompt,
+            request_options={"timeout": timeout or self.timeout},
+        )
+        return response.text or ""
+
+    def warm_up(self) -> None:
+        gemini_model(self.model_name, self.api_key)
+
+    def is_retryable(self, exc: Exception) -> bool:
+        try:
+            from google.api_core import exceptions as gexc
+        except ImportError:
+            return super().is_retryable(exc)
+        transient = (gexc.DeadlineExceeded, gexc.ServiceUnavailable, gexc.ResourceExhausted, gexc.InternalServerError)
+        return isinstance(exc, transient) or super().is_retryable(exc)
+
+
+class RegexBackend(ExtractionBackend):
+    """Offline extraction with the regex readers in extraction.py; ignores prompts."""
+
+    name = "regex"
+    wants_image = False
+    verifies = False
+    inline = True
+
+    def _generate(self, task, prompt, image, context, timeout=None):
+        if task == "bill_extract":
+            return json.dumps(regex_extract_bill(context.get("ocr_text") or ""))
+        if task == "bill_verify":
+            return json.dumps(context.get("extracted") or {})
+        if task == "voice":
+            return json.dumps(regex_extract_voice(context.get("transcript") or ""))
+        raise ValueError(f"unknown task {task!r}")
+
+
+class HttpStubBackend(ExtractionBackend):
+    """Calls a local LLM stand-in (see llm_stub_server.py) over HTTP.
+
+    Sends ``{task, prompt, context, image_size}`` to ``POST {url}/generate``
+    and expects ``{"text": ...}`` back. Used to load-test the upload path
+    without network access or API quota.
+    """
+
+    name = "stub"
+
+    def __init__(self, url: str, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.url = url.rstrip("/")
+
+    @property
+    def cache_namespace(self) -> str:
+        return f"stub:{self.url}"
+
+    def _generate(self, task, prompt, image, context, timeout=None):
+        body = json.dumps({
+            "task": task,
+            "prompt": prompt,
+            "context": dict(context),
+            "image_size": list(image.size) if image is not None else None,
+        }, default=str).encode("utf-8")
+        req = urllib.request.Request(
+            f"{self.url}/generate", data=body, headers={"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=timeout or self.timeout) as resp:
+                return json.load(io.TextIOWrapper(resp, encoding="utf-8"))["text"]
+        except urllib.error.HTTPError as e:
+            if e.code == 429 or e.code >= 500:
+                raise ConnectionError(f"stub returned HTTP {e.code}") from e
+            raise
+        except urllib.error.URLError as e:
+            raise ConnectionError(str(e.reason)) from e
+
+
+def backend_from_env(env: Mapping[str, str] = os.environ) -> ExtractionBackend:
+    """Build the backend named by LEDGERLY_LLM_BACKEND (gemini when a key is set, else regex)."""
+    has_key = bool(env.get("GEMINI_API_KEY"))
+    name = (env.get("LEDGERLY_LLM_BACKEND") or ("gemini" if has_key else "regex")).strip().lower()
+    limits = {
+        "timeout": float(env.get("LEDGERLY_LLM_TIMEOUT", "60")),
+        "retries": int(env.get("LEDGERLY_LLM_RETRIES", "2")),
+        "concurrency": int(env.get("LEDGERLY_LLM_CONCURRENCY", "4")),
+        "deadline": float(env.get("LEDGERLY_LLM_DEADLINE", "90")),
+        "record_path": env.get("LEDGERLY_LLM_RECORD") or None,
+    }
+    failures = int(env.get("LEDGERLY_LLM_BREAKER_FAILURES", "5"))
+    if failures > 0:
+        limits["breaker"] = CircuitBreaker(failures, float(env.get("LEDGERLY_LLM_BREAKER_RESET", "30")))
+    if name == "gemini":
+        if has_key:
+            return GeminiBackend(env.get("GEMINI_MODEL") or "gemini-1.5-flash", env["GEMINI_API_KEY"], **limits)
+        print("[ledgerly] LEDGERLY_LLM_BACKEND=gemini but GEMINI_API_KEY is not set; using regex extraction.")
+    elif name == "stub":
+        return HttpStubBackend(env.get("LEDGERLY_LLM_STUB_URL", "http://127.0.0.1:8765"), **limits)
+    elif name != "regex":
+        print(f"[ledgerly] Unknown LEDGERLY_LLM_BACKEND={name!r}; using regex extraction.")
+    for key in ("retries", "breaker"):
+        limits.pop(key, None)
+    return RegexBackend(**limits)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, ContextManager
+
+
+class LlmCache:
+    """Persistent cache of raw LLM responses stored in the ``llm_cache`` table.
+
+    Keys combine the model name, prompt template version and a hash of every
+    input part, so bumping a template version invalidates its old entries.
+    Entries expire after ``ttl_seconds``; once the table grows past
+    ``max_entries`` the least recently used rows are evicted.
+    """
+
+    # Run eviction once every N writes rather than on each put.
+    EVICT_EVERY = 50
+
+    def __init__(
+        self,
+        get_conn: Callable[[], ContextManager[sqlite3.Connection]],
+        ttl_seconds: float = 30 * 24 * 3600,
+        max_entries: int = 5000,
+    ) -> None:
+        self._get_conn = get_conn
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+
+    @staticmethod
+    def make_key(model_name: str, prompt_version: str, *parts: str | bytes) -> str:
+        digest = hashlib.sha256()
+        for part in (model_name, prompt_version, *parts):
+            data = part.encode("utf-8") if isinstance(part, str) else part
+            # Length-prefix each part so ("ab", "c") and ("a", "bc") differ.
+            digest.update(len(data).to_bytes(8, "big"))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._get_conn() as conn:
+            row = conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE llm_cache SET last_used_at = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        with self._lock:
+            if row is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return row["response"] if row is not None else None
+
+    def put(self, key: str, model_name: str, prompt_version: str, response: str) -> None:
+        now = time.time()
+        with self._get_conn() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO llm_cache (key, model, prompt_version, response, created_at, last_used_at, hits)
+                   VALUES (?, ?, ?, ?, ?, ?, 0)""",
+                (key, model_name, prompt_version, response, now, now),
+            )
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % self.EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired rows, then least recently used rows beyond ``max_entries``."""
+        with self._get_conn() as conn:
+            removed = conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+            removed += conn.execute(
+                """DELETE FROM llm_cache WHERE key IN (
+                       SELECT key FROM llm_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_entries,),
+            ).rowcount
+        return removed
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            hits, misses = self._hits, self._misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+        }
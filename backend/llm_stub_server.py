@@ -0,0 +1,113 @@
+"""Local stand-in for the LLM, for offline load tests of the upload path.
+
+Serves ``POST /generate`` for ``HttpStubBackend`` (LEDGERLY_LLM_BACKEND=stub).
+Replies replay recorded responses: an exact prompt match first, otherwise the
+task's recordings in rotation. Tasks with no recordings are answered by the
+regex extractors. Record real replies by running the app with
+``LEDGERLY_LLM_RECORD=recordings.jsonl``.
+
+    python llm_stub_server.py [--port 8765] [--latency-ms 800] [--jitter-ms 200]
+                              [--error-rate 0.0] [recordings.jsonl ...]
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from llm_backends import TASKS, RegexBackend, prompt_digest
+
+
+class Recordings:
+    def __init__(self, paths: list[str]) -> None:
+        self.by_prompt: dict[str, str] = {}
+        by_task: dict[str, list[str]] = {task: [] for task in TASKS}
+        for path in paths:
+            for line in Path(path).read_text(encoding="utf-8").splitlines():
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                if rec.get("prompt_sha256"):
+                    self.by_prompt[rec["prompt_sha256"]] = rec["text"]
+                by_task.setdefault(rec["task"], []).append(rec["text"])
+        self.counts = {task: len(texts) for task, texts in by_task.items()}
+        self._cycles = {task: itertools.cycle(texts) for task, texts in by_task.items() if texts}
+        self._lock = threading.Lock()
+        self._regex = RegexBackend(concurrency=256)
+
+    def reply(self, task: str, prompt: str, context: dict) -> tuple[str, str]:
+        """(text, source) where source is prompt / task / regex."""
+        text = self.by_prompt.get(prompt_digest(prompt))
+        if text is not None:
+            return text, "prompt"
+        with self._lock:
+            cycle = self._cycles.get(task)
+            if cycle is not None:
+                return next(cycle), "task"
+        return self._regex.generate(task, prompt, None, context), "regex"
+
+
+def make_handler(recordings: Recordings, latency: float, jitter: float, error_rate: float):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/generate":
+                return self._send(404, {"error": "not_found"})
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+                task, prompt = body["task"], body.get("prompt") or ""
+            except (ValueError, KeyError, TypeError):
+                return self._send(400, {"error": "bad_request"})
+            time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+            if error_rate and random.random() < error_rate:
+                return self._send(503, {"error": "simulated_unavailable"})
+            try:
+                text, source = recordings.reply(task, prompt, body.get("context") or {})
+            except ValueError as e:
+                return self._send(400, {"error": str(e)})
+            self._send(200, {"text": text, "source": source})
+
+        def _send(self, status: int, payload: dict) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, fmt, *args):  # keep load tests quiet
+            pass
+
+    return StubHandler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recordings", nargs="*", help="JSON-lines files written via LEDGERLY_LLM_RECORD")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="simulated model latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=200.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 503")
+    args = parser.parse_args()
+
+    recordings = Recordings(args.recordings)
+    handler = make_handler(recordings, args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    print(f"[ledgerly] LLM stub on http://{args.host}:{args.port} "
+          f"(latency {args.latency_ms:.0f}±{args.jitter_ms:.0f}ms, recordings {recordings.counts})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+# Histogram bucket upper bounds (seconds): sub-millisecond SQLite work up to
+# multi-second OCR and LLM calls.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_METRIC = "ledgerly_stage_seconds"
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Trace:
+    """Per-request (or per-job) stage breakdown, used for slow-request logs."""
+
+    def __init__(self, label: str) -> None:
+        self.label = label
+        self.started = time.perf_counter()
+        self.stages: dict[str, list] = {}  # stage -> [seconds, calls]
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def breakdown(self) -> str:
+        with self._lock:
+            items = sorted(self.stages.items(), key=lambda kv: kv[1][0], reverse=True)
+        return " ".join(
+            f"{name}={secs * 1000:.1f}ms" + (f"x{calls}" if calls > 1 else "")
+            for name, (secs, calls) in items
+        ) or "no stages recorded"
+
+
+class Metrics:
+    """In-process histograms rendered in Prometheus text format.
+
+    ``stage()`` times a block into ``ledgerly_stage_seconds{stage=...}`` and
+    into the calling thread's current trace, if one was started.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self._histograms: dict[str, dict[tuple[tuple[str, str], ...], Histogram]] = {}
+        self._help: dict[str, str] = {STAGE_METRIC: "Time spent in each pipeline stage."}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram(self.buckets)
+            hist.observe(seconds)
+
+    def record_stage(self, stage: str, seconds: float, trace: Trace | None = None) -> None:
+        self.observe(STAGE_METRIC, seconds, stage=stage)
+        trace = trace or self.current_trace()
+        if trace is not None:
+            trace.add(stage, seconds)
+
+    @contextmanager
+    def stage(self, name: str, trace: Trace | None = None) -> Iterator[None]:
+        """Time a block; pass ``trace`` when running on a helper thread."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - t0, trace)
+
+    def current_trace(self) -> Trace | None:
+        return getattr(self._local, "trace", None)
+
+    def start_trace(self, label: str) -> Trace:
+        trace = Trace(label)
+        self._local.trace = trace
+        return trace
+
+    def finish_trace(self) -> Trace | None:
+        trace = self.current_trace()
+        self._local.trace = None
+        return trace
+
+    @contextmanager
+    def trace(self, label: str) -> Iterator[Trace]:
+        """Collect stages for a unit of work outside a request (e.g. a bill job)."""
+        outer = self.current_trace()
+        trace = self.start_trace(label)
+        try:
+            yield trace
+        finally:
+            self._local.trace = outer
+
+    def render(self, extra: Iterable[tuple[str, str, str, float]] = ()) -> str:
+        """Prometheus text exposition, plus ``extra`` single-value series as (name, type, help, value)."""
+        lines: list[str] = []
+        with self._lock:
+            snapshot = {
+                name: [(key, list(h.counts), h.sum, h.count) for key, h in series.items()]
+                for name, series in self._histograms.items()
+            }
+        for name in sorted(snapshot):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, counts, total, count in sorted(snapshot[name]):
+                labels = ",".join(f'{k}="{_escape(v)}"' for k, v in key)
+                prefix = labels + "," if labels else ""
+                cumulative = 0
+                for bound, n in zip((*self.buckets, float("inf")), counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+                suffix = "{" + labels + "}" if labels else ""
+                lines.append(f"{name}_sum{suffix} {total}")
+                lines.append(f"{name}_count{suffix} {count}")
+        for name, kind, help_text, value in extra:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Process-wide registry; worker processes (batch OCR) keep their own copies,
+# which are not exported.
+metrics = Metrics()
+stage = metrics.stage
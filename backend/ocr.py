@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image
+from pdf2image import convert_from_path, pdfinfo_from_path
+from pdf2image.exceptions import PDFInfoNotInstalledError, PDFPageCountError, PDFSyntaxError
+
+from metrics import metrics, stage
+
+# Configure Tesseract path with env override and PATH fallback
+_default_tesseract = Path(r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe")
+_env_tesseract = os.environ.get("TESSERACT_CMD")
+
+if _env_tesseract and Path(_env_tesseract).exists():
+    pytesseract.pytesseract.tesseract_cmd = _env_tesseract
+elif _default_tesseract.exists():
+    pytesseract.pytesseract.tesseract_cmd = str(_default_tesseract)
+else:
+    # Leave pytesseract to search PATH; helpful message on failure
+    print("[ledgerly] Tesseract executable not found at default location; relying on PATH.")
+
+# In-memory image preprocessing: cap the long side (0 disables) and optional deskew
+IMAGE_MAX_DIM = int(os.environ.get("LEDGERLY_IMAGE_MAX_DIM", "2000"))
+IMAGE_DESKEW = os.environ.get("LEDGERLY_IMAGE_DESKEW", "0") == "1"
+
+# PDF bills: pages rendered per bill, render resolution and parallel page renders/OCR
+PDF_MAX_PAGES = int(os.environ.get("LEDGERLY_PDF_MAX_PAGES", "10"))
+PDF_DPI = int(os.environ.get("LEDGERLY_PDF_DPI", "200"))
+PDF_THREADS = int(os.environ.get("LEDGERLY_PDF_THREADS", "2"))
+
+# ================================
+# 🔥 STEP 1: IMAGE PREPROCESSING
+# ================================
+def decode_bill_image(data: bytes) -> np.ndarray | None:
+    """Decode uploaded image bytes straight into a grayscale array (no temp files)."""
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if img is not None:
+        return img
+    # OpenCV can't decode every allowed format (e.g. GIF); PIL covers the rest.
+    try:
+        return np.array(Image.open(io.BytesIO(data)).convert("L"))
+    except Exception:
+        return None
+
+
+def _deskew(img: np.ndarray) -> np.ndarray:
+    """Rotate a binarized page so text lines are horizontal (small angles only)."""
+    coords = cv2.findNonZero(cv2.bitwise_not(img))
+    if coords is None:
+        return img
+    angle = cv2.minAreaRect(coords)[-1]
+    if angle > 45:
+        angle -= 90
+    if abs(angle) < 0.5 or abs(angle) > 15:
+        return img
+    h, w = img.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(img, matrix, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+def preprocess_bill_image(img: np.ndarray) -> np.ndarray:
+    """
+    Preprocess a grayscale bill image in memory for better OCR and LLM accuracy.
+    - Downscales very large photos (IMAGE_MAX_DIM)
+    - Applies adaptive thresholding to remove shadows
+    - Enhances handwriting visibility
+    - Optionally deskews (IMAGE_DESKEW)
+    The result is shared by Tesseract and the Gemini stage.
+    """
+    try:
+        h, w = img.shape[:2]
+        if IMAGE_MAX_DIM and max(h, w) > IMAGE_MAX_DIM:
+            scale = IMAGE_MAX_DIM / max(h, w)
+            img = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+        # Adaptive threshold - removes shadows, enhances text
+        processed = cv2.adaptiveThreshold(
+            img, 255,
+            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+            cv2.THRESH_BINARY,
+            11, 2
+        )
+
+        if IMAGE_DESKEW:
+            processed = _deskew(processed)
+        return processed
+    except Exception:
+        return img  # Return original on any error
+
+
+def iter_pdf_pages(pdf_path: Path) -> Iterator[Image.Image]:
+    """Render PDF pages lazily, at most PDF_THREADS pages at a time.
+
+    Page count is capped at PDF_MAX_PAGES and resolution at PDF_DPI. Each
+    chunk is rendered in parallel by pdf2image and yielded page by page, so
+    only one chunk is held in memory. Raises on conversion errors.
+    """
+    poppler_path = os.environ.get("POPPLER_PATH")  # Optional: path to poppler bin on Windows
+    info = pdfinfo_from_path(str(pdf_path), poppler_path=poppler_path)
+    page_count = min(int(info.get("Pages", 1)), PDF_MAX_PAGES)
+    chunk = max(1, PDF_THREADS)
+    for first in range(1, page_count + 1, chunk):
+        last = min(first + chunk - 1, page_count)
+        pages = convert_from_path(
+            str(pdf_path),
+            dpi=PDF_DPI,
+            first_page=first,
+            last_page=last,
+            thread_count=chunk,
+            poppler_path=poppler_path,
+        )
+        while pages:
+            yield pages.pop(0)
+
+
+PDF_CONVERSION_ERROR = {
+    "error": "pdf_conversion_failed",
+    "message": (
+        "Could not convert PDF to image. Install Poppler and set POPPLER_PATH to its bin folder, "
+        "then restart the server."
+    ),
+}
+TESSERACT_MISSING_ERROR = {
+    "error": "tesseract_missing",
+    "message": (
+        "Tesseract executable not found. Set TESSERACT_CMD to your tesseract.exe path "
+        "or add it to PATH, then restart the server."
+    ),
+}
+
+
+def _ocr_pdf(local_path: Path, want_image: bool) -> dict:
+    """OCR every page of a PDF as it renders; page texts are merged in page order."""
+    texts: list[str] = []
+    first_image = None
+    in_flight: list = []
+    trace = metrics.current_trace()
+
+    def ocr_page(image: np.ndarray) -> str:
+        with stage("tesseract", trace):
+            return pytesseract.image_to_string(image)
+
+    with ThreadPoolExecutor(max_workers=max(1, PDF_THREADS)) as page_pool:
+        try:
+            pages = iter_pdf_pages(local_path)
+            while True:
+                with stage("pdf_render"):
+                    page = next(pages, None)
+                if page is None:
+                    break
+                with stage("preprocess"):
+                    image = preprocess_bill_image(np.array(page.convert("L")))
+                del page
+                if first_image is None and want_image:
+                    first_image = image
+                in_flight.append(page_pool.submit(ocr_page, image))
+                # Bound pages waiting on Tesseract so big statements don't pile up in memory.
+                while len(in_flight) > PDF_THREADS:
+                    texts.append(in_flight.pop(0).result())
+            while in_flight:
+                texts.append(in_flight.pop(0).result())
+        except pytesseract.TesseractNotFoundError:
+            return dict(TESSERACT_MISSING_ERROR)
+        except (PDFInfoNotInstalledError, PDFPageCountError, PDFSyntaxError) as e:
+            print(f"[ledgerly] PDF conversion failed: {e}")
+            return dict(PDF_CONVERSION_ERROR)
+        except Exception as e:
+            return {"error": "ocr_failed", "message": f"Failed to read image/PDF: {e}"}
+
+    if not texts:
+        return dict(PDF_CONVERSION_ERROR)
+    # The first page goes to the LLM; OCR hints cover every page.
+    return {"ocr_text": "\n".join(texts), "image": first_image, "page_count": len(texts)}
+
+
+def ocr_bill_file(path: str, want_image: bool = True) -> dict:
+    """Decode, preprocess and OCR a stored bill file.
+
+    Returns ``{"ocr_text", "image", "page_count"}`` (the preprocessed array
+    when ``want_image``; the first page for PDFs) or ``{"error", "message"}``.
+    Top-level and picklable so batch uploads can run it in a process pool.
+    """
+    local_path = Path(path)
+    if local_path.suffix.lower() == ".pdf":
+        return _ocr_pdf(local_path, want_image)
+
+    # Decode once into memory
+    with stage("decode"):
+        gray = decode_bill_image(local_path.read_bytes())
+    if gray is None:
+        return {"error": "ocr_failed", "message": "Failed to read image/PDF: unsupported or corrupt image"}
+
+    # Grayscale/threshold/deskew in memory; the same buffer feeds Tesseract and Gemini
+    with stage("preprocess"):
+        image = preprocess_bill_image(gray)
+
+    # Run Tesseract OCR on the preprocessed buffer
+    try:
+        with stage("tesseract"):
+            ocr_text = pytesseract.image_to_string(image)
+    except pytesseract.TesseractNotFoundError:
+        return dict(TESSERACT_MISSING_ERROR)
+    except Exception as e:
+        return {"error": "ocr_failed", "message": f"Failed to read image/PDF: {e}"}
+
+    return {"ocr_text": ocr_text, "image": image if want_image else None, "page_count": 1}
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000".
+DEFAULT_METHOD = "scrypt:32768:8:1"
+
+
+class HasherBusyError(RuntimeError):
+    """Too many password hashes are queued; the caller should retry later."""
+
+
+class PasswordHasher:
+    """Runs password hashing and verification on a small dedicated pool.
+
+    Hashing is deliberately slow, so at most ``workers`` hashes run at once
+    (hashlib releases the GIL while it works) and at most ``max_queue`` more
+    may wait. A call is refused with ``HasherBusyError`` up front, instead of
+    tying up another request thread, when the queue is full or when the queue
+    ahead of it would take longer than ``timeout`` at the recent average hash
+    time; an admitted call always runs to completion. Hashes made with a
+    different ``method`` than the configured one report ``needs_rehash``.
+    """
+
+    def __init__(self, method: str = DEFAULT_METHOD, workers: int = 2, max_queue: int = 32,
+                 timeout: float = 10.0) -> None:
+        self.method = method
+        self.timeout = timeout
+        self._workers = max(1, workers)
+        self._limit = self._workers + max(0, max_queue)
+        self._pending = 0
+        self._avg_seconds = 0.0  # moving average of hash/check durations; 0 until the first one
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="ledgerly-hash")
+        # Hash once on the pool: yields the stored method prefix and the first duration sample.
+        self._prefix = self._executor.submit(self._timed, generate_password_hash, "", method)
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        return password_hash.split("$", 1)[0] != self.method_prefix
+
+    @property
+    def method_prefix(self) -> str:
+        """``method`` with Werkzeug's defaults filled in, as stored before the first ``$``."""
+        return self._prefix.result().split("$", 1)[0]
+
+    def stats(self) -> dict:
+        return {"method": self.method, "pending": self._pending, "limit": self._limit,
+                "avg_ms": round(self._avg_seconds * 1000, 1)}
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self._limit:
+                raise HasherBusyError("password hashing queue is full")
+            # Rounds of ``workers`` hashes that finish before this one does.
+            expected_wait = math.ceil((self._pending + 1) / self._workers) * self._avg_seconds
+            if expected_wait > self.timeout:
+                raise HasherBusyError("password hashing queue is too slow")
+            self._pending += 1
+        future = self._executor.submit(self._timed, fn, *args)
+        future.add_done_callback(self._release)
+        return future.result()
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._avg_seconds = elapsed if not self._avg_seconds else 0.8 * self._avg_seconds + 0.2 * elapsed
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import sqlite3
+from typing import Any, Iterable
+
+# Rollup grains and the entries expression that buckets each one. Buckets
+# follow created_at (UTC, as stored by SQLite's datetime('now')).
+GRAINS = {
+    "day": "substr(created_at, 1, 10)",
+    "month": "substr(created_at, 1, 7)",
+    "vendor": "vendor_name",
+}
+
+_GST_SQL = "COALESCE(cgst_amount, 0) + COALESCE(sgst_amount, 0) + COALESCE(igst_amount, 0)"
+
+
+def add_to_rollups(conn: sqlite3.Connection, where: str, params: Iterable[Any] = ()) -> None:
+    """Fold the entries matching ``where`` into ``entry_rollups``.
+
+    Call once per insert (``"id = ?"``) or once for a whole batch of new rows;
+    rows are grouped per bucket before the upsert. Run it inside the same
+    transaction as the insert so totals never drift from ``entries``.
+    """
+    params = tuple(params)
+    for grain, bucket in GRAINS.items():
+        extra = " AND vendor_name IS NOT NULL AND vendor_name != ''" if grain == "vendor" else ""
+        conn.execute(
+            f"""INSERT INTO entry_rollups (user_id, grain, bucket, income, expense, gst, entry_count)
+                SELECT user_id, '{grain}', {bucket},
+                       SUM(CASE WHEN entry_type = 'income' THEN amount ELSE 0 END),
+                       SUM(CASE WHEN entry_type = 'expense' THEN amount ELSE 0 END),
+                       SUM({_GST_SQL}),
+                       COUNT(*)
+                FROM entries WHERE ({where}){extra}
+                GROUP BY user_id, {bucket}
+                ON CONFLICT(user_id, grain, bucket) DO UPDATE SET
+                    income = income + excluded.income,
+                    expense = expense + excluded.expense,
+                    gst = gst + excluded.gst,
+                    entry_count = entry_count + excluded.entry_count""",
+            params,
+        )
+
+
+def rollup_totals(
+    conn: sqlite3.Connection, user_id: int, date_from: str | None = None, date_to: str | None = None
+) -> dict[str, Any]:
+    """Income/expense/GST totals for a user from rollups (day buckets when a range is given)."""
+    if date_from or date_to:
+        sql = "SELECT SUM(income), SUM(expense), SUM(gst), SUM(entry_count) FROM entry_rollups WHERE user_id = ? AND grain = 'day'"
+        params: list[Any] = [user_id]
+        if date_from:
+            sql += " AND bucket >= ?"
+            params.append(date_from)
+        if date_to:
+            sql += " AND bucket <= ?"
+            params.append(date_to)
+    else:
+        sql = "SELECT SUM(income), SUM(expense), SUM(gst), SUM(entry_count) FROM entry_rollups WHERE user_id = ? AND grain = 'month'"
+        params = [user_id]
+    income, expense, gst, count = conn.execute(sql, params).fetchone()
+    income, expense = float(income or 0), float(expense or 0)
+    return {
+        "income": income,
+        "expense": expense,
+        "net": income - expense,
+        "gst": float(gst or 0),
+        "entry_count": int(count or 0),
+    }
+
+
+def rollup_series(
+    conn: sqlite3.Connection,
+    user_id: int,
+    grain: str,
+    since: str | None = None,
+    limit: int | None = None,
+) -> list[dict[str, Any]]:
+    """Rollup rows for one grain: periods oldest-first, vendors by expense descending."""
+    sql = "SELECT bucket, income, expense, gst, entry_count FROM entry_rollups WHERE user_id = ? AND grain = ?"
+    params: list[Any] = [user_id, grain]
+    if since is not None:
+        sql += " AND bucket >= ?"
+        params.append(since)
+    sql += " ORDER BY expense DESC, bucket" if grain == "vendor" else " ORDER BY bucket"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return [
+        {
+            "vendor" if grain == "vendor" else "period": row["bucket"],
+            "income": float(row["income"]),
+            "expense": float(row["expense"]),
+            "net": float(row["income"]) - float(row["expense"]),
+            "gst": float(row["gst"]),
+            "entry_count": int(row["entry_count"]),
+        }
+        for row in conn.execute(sql, params).fetchall()
+    ]
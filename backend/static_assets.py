@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from flask import Request, Response
+from werkzeug.security import safe_join
+
+try:  # optional: serve br as well as gzip
+    import brotli
+except ImportError:
+    brotli = None
+
+# Fingerprinted URLs (?v=<version>) never change content; everything else revalidates via ETag.
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".html", ".json", ".txt", ".map"}
+MIN_COMPRESS_BYTES = 512
+# Bigger files are not kept in memory; callers fall back to send_from_directory.
+MAX_CACHED_BYTES = 2 * 1024 * 1024
+
+# href/src attributes pointing at a mounted asset, absolute or ../ relative.
+_ASSET_REF = re.compile(r"""(\b(?:href|src)=["'])(?:\.\./|/)([a-z]+)/([^"'?#]+)(["'])""")
+
+
+@dataclass(frozen=True)
+class Asset:
+    mtime_ns: int
+    size: int
+    version: str  # short content hash, used for the ETag and ?v=
+    mimetype: str
+    # Content-Encoding -> body; "identity" is always present.
+    bodies: dict[str, bytes] = field(default_factory=dict)
+    # (mount, relative path, version) of assets referenced by a rewritten page.
+    deps: tuple[tuple[str, str, str], ...] = ()
+
+
+class StaticAssets:
+    """In-memory static files with content-hash ETags and precompressed variants.
+
+    ``mounts`` maps the first URL segment (``styles``, ``script``, ...) to a
+    directory whose top-level files are served. Files are hashed and
+    gzip/brotli-compressed once, then re-read only when their mtime or size
+    changes, so editing files during development still works. Sibling ``.gz`` / ``.br`` files produced by a
+    build step are preferred over compressing in process. HTML pages get their
+    asset references rewritten to fingerprinted ``?v=`` URLs, which are served
+    as immutable.
+    """
+
+    def __init__(self, mounts: dict[str, Path], pages_dir: Path) -> None:
+        self.mounts = mounts
+        self.pages_dir = pages_dir
+        self._assets: dict[Path, Asset] = {}
+        self._lock = threading.Lock()
+
+    def warm(self) -> int:
+        """Load every mounted file and page up front; returns how many were cached."""
+        count = 0
+        for mount, root in self.mounts.items():
+            for path in sorted(root.iterdir()) if root.is_dir() else ():
+                if path.is_file() and path.suffix not in {".gz", ".br"}:
+                    count += self.asset(mount, path.name) is not None
+        for path in sorted(self.pages_dir.glob("*.html")):
+            count += self.page_asset(path.name) is not None
+        return count
+
+    def asset(self, mount: str, name: str) -> Asset | None:
+        root = self.mounts.get(mount)
+        # Only files directly inside a mount (uploads/bills/ is user content).
+        if root is None or "/" in name or "\\" in name:
+            return None
+        joined = safe_join(str(root), name)
+        return self._load(Path(joined)) if joined is not None else None
+
+    def page_asset(self, name: str) -> Asset | None:
+        joined = safe_join(str(self.pages_dir), name)
+        if joined is None:
+            return None
+        path = Path(joined)
+        cached = self._assets.get(path)
+        # A page is also stale when any asset it links to changed.
+        if cached is not None and any(
+            (dep := self.asset(mount, rel)) is None or dep.version != version
+            for mount, rel, version in cached.deps
+        ):
+            with self._lock:
+                self._assets.pop(path, None)
+        return self._load(path, rewrite=True)
+
+    def respond(self, asset: Asset, request: Request) -> Response:
+        encoding = "identity"
+        for candidate in ("br", "gzip"):
+            if candidate in asset.bodies and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+        response = Response(asset.bodies[encoding], mimetype=asset.mimetype)
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+        if len(asset.bodies) > 1:
+            response.vary.add("Accept-Encoding")
+        response.set_etag(asset.version if encoding == "identity" else f"{asset.version}-{encoding}")
+        fingerprinted = request.args.get("v") == asset.version
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE if fingerprinted else REVALIDATE_CACHE
+        return response.make_conditional(request)
+
+    def _load(self, path: Path, rewrite: bool = False) -> Asset | None:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        if not path.is_file() or stat.st_size > MAX_CACHED_BYTES:
+            return None
+        cached = self._assets.get(path)
+        if cached is not None and cached.mtime_ns == stat.st_mtime_ns and cached.size == stat.st_size:
+            return cached
+
+        data = path.read_bytes()
+        deps: tuple[tuple[str, str, str], ...] = ()
+        if rewrite:
+            data, deps = self._fingerprint_refs(data)
+        mimetype = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        asset = Asset(
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            version=hashlib.sha256(data).hexdigest()[:16],
+            mimetype=mimetype,
+            bodies=self._encode(path, data, stat.st_mtime_ns, rewritten=rewrite),
+            deps=deps,
+        )
+        with self._lock:
+            self._assets[path] = asset
+        return asset
+
+    def _fingerprint_refs(self, data: bytes) -> tuple[bytes, tuple[tuple[str, str, str], ...]]:
+        text = data.decode("utf-8")
+        deps: list[tuple[str, str, str]] = []
+
+        def replace(match: re.Match) -> str:
+            prefix, mount, rel, quote = match.groups()
+            asset = self.asset(mount, rel)
+            if asset is None:
+                return match.group(0)
+            deps.append((mount, rel, asset.version))
+            return f"{prefix}/{mount}/{rel}?v={asset.version}{quote}"
+
+        return _ASSET_REF.sub(replace, text).encode("utf-8"), tuple(deps)
+
+    @staticmethod
+    def _encode(path: Path, data: bytes, mtime_ns: int, rewritten: bool) -> dict[str, bytes]:
+        bodies = {"identity": data}
+        if path.suffix.lower() not in COMPRESSIBLE_SUFFIXES or len(data) < MIN_COMPRESS_BYTES:
+            return bodies
+        for encoding, ext in (("br", ".br"), ("gzip", ".gz")):
+            prebuilt = path.with_name(path.name + ext)
+            if not rewritten and prebuilt.is_file() and prebuilt.stat().st_mtime_ns >= mtime_ns:
+                bodies[encoding] = prebuilt.read_bytes()
+        if "br" not in bodies and brotli is not None:
+            bodies["br"] = brotli.compress(data, quality=11)
+        if "gzip" not in bodies:
+            bodies["gzip"] = gzip.compress(data, compresslevel=9, mtime=0)
+        return bodies
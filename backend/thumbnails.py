@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Variant name -> (longest side in px, WEBP quality).
+SIZES = {
+    "thumb": (256, 70),
+    "preview": (1024, 80),
+}
+
+# A failed render leaves a marker next to the variant; requests within this many
+# seconds return None without rendering again (e.g. until Poppler is installed).
+FAILED_RETRY_SECONDS = 3600
+
+
+def variant_path(source: Path, size: str, cache_dir: Path) -> Path:
+    # Bill files are content-addressed, so the variant name is stable for the same bytes.
+    return cache_dir / f"{source.stem}-{size}.webp"
+
+
+def _failure_marker(target: Path) -> Path:
+    return target.with_name(f".{target.name}.failed")
+
+
+def _open_first_page(source: Path, max_side: int) -> Image.Image:
+    # Pillow and pdf2image are imported here so importing the app stays cheap.
+    from PIL import Image, ImageOps
+
+    if source.suffix.lower() == ".pdf":
+        from pdf2image import convert_from_path
+
+        return convert_from_path(str(source), first_page=1, last_page=1, size=(max_side, None))[0]
+    img = Image.open(source)
+    # JPEG can decode straight at a reduced scale, which is most of the work for phone photos.
+    img.draft("RGB", (max_side * 2, max_side * 2))
+    return ImageOps.exif_transpose(img)
+
+
+def ensure_variant(source: Path, size: str, cache_dir: Path) -> Path | None:
+    """Path of the WEBP ``size`` variant of ``source``, rendering it on first use.
+
+    Returns None when the source can't be read (missing file, undecodable
+    image, PDF without Poppler); a source that failed to render is not
+    retried for ``FAILED_RETRY_SECONDS``.
+    """
+    target = variant_path(source, size, cache_dir)
+    if target.exists():
+        return target
+    marker = _failure_marker(target)
+    try:
+        if time.time() - marker.stat().st_mtime < FAILED_RETRY_SECONDS:
+            return None
+    except FileNotFoundError:
+        pass
+    from PIL import Image
+
+    max_side, quality = SIZES[size]
+    try:
+        img = _open_first_page(source, max_side)
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+        if img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # Concurrent renders of the same variant each write a temp file; the last rename wins.
+        tmp = cache_dir / f".{target.name}-{uuid.uuid4().hex}.part"
+        try:
+            img.save(tmp, "WEBP", quality=quality, method=4)
+            os.replace(tmp, target)
+        finally:
+            tmp.unlink(missing_ok=True)
+    except Exception as e:
+        print(f"[ledgerly] could not render {size} for {source.name}: {e}")
+        if source.is_file():
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            marker.touch()
+        return None
+    return target
+
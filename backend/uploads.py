@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import BinaryIO
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Leading bytes of the bill formats we accept -> stored file extension.
+_SIGNATURES = (
+    (b"%PDF-", "pdf"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"II*\x00", "tiff"),
+    (b"MM\x00*", "tiff"),
+    (b"BM", "bmp"),
+)
+SNIFF_BYTES = 16
+
+
+def detect_file_type(head: bytes) -> str | None:
+    """Bill file type from its first bytes (magic numbers), or None if unsupported."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for magic, kind in _SIGNATURES:
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+class UploadRejected(ValueError):
+    """The uploaded bytes are not a bill file we can process."""
+
+    def __init__(self, error: str, message: str) -> None:
+        super().__init__(message)
+        self.error = error
+        self.message = message
+
+
+class UploadSpool:
+    """Write-through file for one upload: hashed, sniffed and size-checked as chunks arrive.
+
+    Data lands in a ``.part`` file in ``dest_dir`` so ``commit`` only has to
+    rename it to its content-addressed name; ``close`` without a commit
+    deletes it. Exceeding ``max_bytes`` (0 = unlimited) raises
+    ``RequestEntityTooLarge`` immediately, before the rest is read.
+    """
+
+    def __init__(self, dest_dir: Path, max_bytes: int = 0) -> None:
+        self.path = dest_dir / f".upload-{uuid.uuid4().hex}.part"
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.head = b""
+        self._digest = hashlib.sha256()
+        self._fh = open(self.path, "w+b")
+        self._committed = False
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.max_bytes and self.size > self.max_bytes:
+            self.close()
+            raise RequestEntityTooLarge(f"Bill files are limited to {self.max_bytes // (1024 * 1024)} MB.")
+        if len(self.head) < SNIFF_BYTES:
+            self.head += data[: SNIFF_BYTES - len(self.head)]
+        self._digest.update(data)
+        return self._fh.write(data)
+
+    # Werkzeug seeks back to the start once a part is parsed; FileStorage may read.
+    def read(self, size: int = -1) -> bytes:
+        return self._fh.read(size)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._fh.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._fh.tell()
+
+    def commit(self, dest_dir: Path) -> tuple[Path, str]:
+        """Move the data to ``dest_dir/<sha256>.<type>``; returns (path, hex digest)."""
+        kind = detect_file_type(self.head)
+        if kind is None:
+            self.close()
+            raise UploadRejected("invalid_file_type", "Only image files (PNG, JPG, PDF, etc.) are allowed.")
+        self._fh.close()
+        content_hash = self._digest.hexdigest()
+        final_path = dest_dir / f"{content_hash}.{kind}"
+        if final_path.exists():
+            self.path.unlink(missing_ok=True)
+        else:
+            os.replace(self.path, final_path)
+        self._committed = True
+        return final_path, content_hash
+
+    def close(self) -> None:
+        self._fh.close()
+        if not self._committed:
+            self.path.unlink(missing_ok=True)
+
+
+def store_upload(stream: BinaryIO, dest_dir: Path, max_bytes: int = 0) -> tuple[Path, str]:
+    """Store an upload as ``dest_dir/<sha256>.<type>``, hashing while writing.
+
+    The type comes from the file's magic bytes, not its name; unsupported
+    content raises ``UploadRejected`` and oversized content
+    ``RequestEntityTooLarge``. Multipart parts already spooled by
+    ``SpoolingRequest`` are renamed into place without another copy. If a file
+    with the same content already exists the new copy is discarded.
+    """
+    if isinstance(stream, UploadSpool):
+        return stream.commit(dest_dir)
+    spool = UploadSpool(dest_dir, max_bytes)
+    try:
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            spool.write(chunk)
+        return spool.commit(dest_dir)
+    finally:
+        spool.close()
+
+
+class SpoolingRequest(Request):
+    """Request whose multipart file parts under ``spool_prefixes`` stream into ``UploadSpool``s.
+
+    Werkzeug would otherwise buffer each part in a temporary file (in memory
+    up to 500 KB) that ``store_upload`` then copies again. Zip archives keep
+    the default handling; their members are stored one by one.
+    """
+
+    spool_dir: Path | None = None
+    spool_prefixes: tuple[str, ...] = ()
+    max_file_bytes = 0
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if (
+            self.spool_dir is not None
+            and self.path.startswith(self.spool_prefixes)
+            and not (filename or "").lower().endswith(".zip")
+        ):
+            spool = UploadSpool(self.spool_dir, self.max_file_bytes)
+            self.__dict__.setdefault("_upload_spools", []).append(spool)
+            return spool
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+    def close(self) -> None:
+        super().close()
+        # Parts that never became a FileStorage (aborted or oversized uploads).
+        for spool in self.__dict__.pop("_upload_spools", ()):
+            spool.close()
@@ -72,13 +72,15 @@
         credentials: 'same-origin' // Ensure cookie is sent
       })
       .then(res => res.json())
+      .then(data => (data.ok && data.bill ? waitForBill(data.bill.id) : data))
       .then(data => {
         processingState.style.display = 'none';
         
-        if (data.ok && data.bill) {
+        if (data.ok && data.bill && data.bill.status === 'done') {
           showResult(data.bill);
         } else {
-          alert('Upload failed: ' + (data.error || 'Unknown error'));
+          const bill = data.bill || {};
+          alert('Upload failed: ' + (bill.error_message || data.error || 'Unknown error'));
           uploadDropZone.style.display = 'flex';
         }
       })
@@ -90,6 +92,23 @@
       });
     }
 
+    // Long-poll until the queued bill leaves the 'processing' state (up to ~5 minutes)
+    const BILL_WAIT_ATTEMPTS = 12;
+
+    function waitForBill(billId, attempt = 1) {
+      return fetch(`/api/bills/${billId}/wait?timeout=25`, { credentials: 'same-origin' })
+        .then(res => res.json())
+        .then(data => {
+          if (!(data.ok && data.bill && data.bill.status === 'processing')) {
+            return data;
+          }
+          if (attempt >= BILL_WAIT_ATTEMPTS) {
+            return { ok: false, error: 'Bill is still processing. Check your bills list again in a few minutes.' };
+          }
+          return waitForBill(billId, attempt + 1);
+        });
+    }
+
     function showResult(bill) {
       resultState.style.display = 'flex';
       
@@ -110,15 +129,13 @@
         ocrPreview.style.display = 'block';
         const debugData = {
           vendor: bill.vendor_name,
-          gstin: bill.vendor_gstin,
           bill_date: bill.bill_date,
           amounts: {
              total: bill.total_amount,
-             taxable: bill.subtotal,
-             cgst: bill.cgst_amount,
-             sgst: bill.sgst_amount,
-             igst: bill.igst_amount
+             detected: bill.detected_amount,
+             gst: bill.gst_amount
           },
+          confidence: bill.confidence,
           items: bill.items
         };
         ocrTextBox.textContent = JSON.stringify(debugData, null, 2);
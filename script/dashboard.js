@@ -16,12 +16,19 @@
     initTableFilters();
   }
 
-  async function loadEntries() {
+  // Keyset pagination state for the entries table
+  const entriesState = { entryType: null, nextBeforeId: null };
+
+  async function loadEntries(append = false) {
     const tbody = document.getElementById('entriesTableBody');
     if (!tbody) return;
 
+    const params = new URLSearchParams({ limit: '50' });
+    if (entriesState.entryType) params.set('entry_type', entriesState.entryType);
+    if (append && entriesState.nextBeforeId) params.set('before_id', String(entriesState.nextBeforeId));
+
     try {
-      const response = await fetch('/api/entries', { credentials: 'same-origin' });
+      const response = await fetch(`/api/entries?${params}`, { credentials: 'same-origin' });
       const data = await response.json();
 
       if (!response.ok || !data.ok) {
@@ -30,13 +37,14 @@
       }
 
       const entries = data.entries || [];
+      entriesState.nextBeforeId = data.has_more ? data.next_before_id : null;
       
-      if (entries.length === 0) {
+      if (entries.length === 0 && !append) {
         tbody.innerHTML = '<tr><td colspan="6" style="text-align: center; padding: 2rem; color: #888;">No entries yet. Use voice entry or upload a bill to add your first entry!</td></tr>';
         return;
       }
 
-      tbody.innerHTML = entries.map((entry, index) => {
+      const rowsHtml = entries.map((entry, index) => {
         const status = entry.entry_type === 'income' ? 'paid' : 'due';
         const statusLabel = entry.entry_type === 'income' ? 'Income' : 'Expense';
         const statusClass = entry.entry_type === 'income' ? 'status-pill--paid' : 'status-pill--due';
@@ -57,6 +65,26 @@
         `;
       }).join('');
 
+      const existingMore = tbody.querySelector('tr[data-load-more]');
+      if (existingMore) existingMore.remove();
+
+      if (append) {
+        tbody.insertAdjacentHTML('beforeend', rowsHtml);
+      } else {
+        tbody.innerHTML = rowsHtml;
+      }
+
+      if (entriesState.nextBeforeId) {
+        tbody.insertAdjacentHTML('beforeend', `
+          <tr data-load-more>
+            <td colspan="6" style="text-align: center; padding: 1rem;">
+              <button type="button" class="filter-chip" data-load-more-btn>Load more</button>
+            </td>
+          </tr>
+        `);
+        tbody.querySelector('[data-load-more-btn]').addEventListener('click', () => loadEntries(true));
+      }
+
     } catch (error) {
       console.error('Error loading entries:', error);
       tbody.innerHTML = '<tr><td colspan="6" style="text-align: center; padding: 2rem; color: #888;">Error loading entries</td></tr>';
@@ -90,24 +118,23 @@
         filterChips.forEach(c => c.classList.remove('is-active'));
         chip.classList.add('is-active');
         
+        // Filter server-side so only the matching page is downloaded
         const status = chip.dataset.status;
-        const rows = document.querySelectorAll('#entriesTableBody tr[data-entry-id]');
-        
-        rows.forEach(row => {
-          if (status === 'all') {
-            row.style.display = '';
-          } else if (status === 'paid') {
-            row.style.display = row.dataset.status === 'paid' ? '' : 'none';
-          } else if (status === 'due' || status === 'overdue') {
-            row.style.display = row.dataset.status === 'due' ? '' : 'none';
-          }
-        });
+        if (status === 'paid') {
+          entriesState.entryType = 'income';
+        } else if (status === 'due' || status === 'overdue') {
+          entriesState.entryType = 'expense';
+        } else {
+          entriesState.entryType = null;
+        }
+        entriesState.nextBeforeId = null;
+        loadEntries();
       });
     });
   }
 
   // Expose refresh function globally for voice-entry.js to call
-  window.refreshDashboardEntries = loadEntries;
+  window.refreshDashboardEntries = () => loadEntries();
 
   function initGreetingAndUser() {
     // Fetch current user
@@ -452,10 +479,16 @@
           body: formData,
         });
 
-        const data = await response.json();
+        const queued = await response.json();
 
         if (!response.ok) {
-          throw new Error(data.message || data.error || 'Upload failed');
+          throw new Error(queued.message || queued.error || 'Upload failed');
+        }
+
+        // Processing runs in the background; wait for the bill to finish
+        const data = await waitForBill(queued.bill.id);
+        if (data.bill.status === 'failed') {
+          throw new Error(data.bill.error_message || data.bill.error || 'Processing failed');
         }
 
         // Show success result
@@ -514,6 +547,23 @@
     }
   }
 
+  // Long-poll the bill until OCR/extraction finishes (up to ~5 minutes)
+  const BILL_WAIT_ATTEMPTS = 12;
+
+  async function waitForBill(billId) {
+    for (let attempt = 0; attempt < BILL_WAIT_ATTEMPTS; attempt++) {
+      const response = await fetch(`/api/bills/${billId}/wait?timeout=25`, { credentials: 'same-origin' });
+      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(data.message || data.error || 'Processing failed');
+      }
+      if (data.bill.status !== 'processing') {
+        return data;
+      }
+    }
+    throw new Error('Bill is still processing. Check your bills list again in a few minutes.');
+  }
+
   // Initialize bill upload when DOM is ready
   document.addEventListener('DOMContentLoaded', () => {
     initBillUpload();
@@ -55,6 +55,43 @@
     });
   });
 
+  // Replace the base scenario's revenue with this month's real figures when signed in
+  async function loadInsights() {
+    try {
+      const response = await fetch('/api/insights?months=2', { credentials: 'same-origin' });
+      if (!response.ok) return;
+      const data = await response.json();
+      const monthly = data.monthly || [];
+      if (!data.ok || monthly.length === 0) return;
+
+      // Buckets are keyed by the entry's UTC created_at month ("YYYY-MM") and only
+      // exist for months with entries, so look the current and previous month up.
+      const monthKey = (d) => `${d.getUTCFullYear()}-${String(d.getUTCMonth() + 1).padStart(2, '0')}`;
+      const now = new Date();
+      const thisMonth = monthKey(now);
+      const lastMonth = monthKey(new Date(Date.UTC(now.getUTCFullYear(), now.getUTCMonth() - 1, 1)));
+      const current = monthly.find((m) => m.period === thisMonth) || { income: 0, entry_count: 0 };
+      const previous = monthly.find((m) => m.period === lastMonth) || null;
+      scenarios.base.revenue = '₹' + Math.round(current.income).toLocaleString('en-IN');
+      if (previous && previous.income > 0) {
+        const change = Math.round(((current.income - previous.income) / previous.income) * 100);
+        scenarios.base.revenueHint = `${change >= 0 ? 'Up' : 'Down'} ${Math.abs(change)}% vs last month`;
+      } else {
+        scenarios.base.revenueHint = `${current.entry_count} entries this month`;
+      }
+
+      const activeChip = document.querySelector('[data-scenario].is-active');
+      if (activeChip && activeChip.dataset.scenario === 'base') {
+        metrics.revenue.textContent = scenarios.base.revenue;
+        metrics.revenueHint.textContent = scenarios.base.revenueHint;
+      }
+    } catch (error) {
+      console.error('Error loading insights:', error);
+    }
+  }
+
+  loadInsights();
+
   if (window.ToastManager) {
     ToastManager.attachTriggers(document);
   }